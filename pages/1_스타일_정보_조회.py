@@ -1,6 +1,7 @@
 import streamlit as st
 import pandas as pd
-from utils import load_google_sheet, show_price_block, get_latest_temu_price, get_latest_shein_price
+from utils import show_price_block
+from sales_data import load_sales_data, latest_prices, search_index
 
 # ===== CSS (등록안됨 배지) =====
 st.markdown("""
@@ -10,13 +11,9 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-PRODUCT_SHEET = "PRODUCT_INFO"
-SHEIN_SHEET = "SHEIN_SALES"
-TEMU_SHEET = "TEMU_SALES"
-
-df_info = load_google_sheet(PRODUCT_SHEET, st.secrets)
-df_shein = load_google_sheet(SHEIN_SHEET, st.secrets)
-df_temu = load_google_sheet(TEMU_SHEET, st.secrets)
+df_info, df_temu, df_shein = load_sales_data()
+LATEST = latest_prices()  # {플랫폼: {style_key: (마지막 판매가, 마지막 판매일)}}
+SEARCH = search_index()   # 상품번호 / 영문명 / 속성값 n-gram 색인 (위 df_info 와 같은 스냅샷, 행 순서)
 
 def _get(row, *keys, default=""):
     """row에서 대소문자 상관없이 첫 매칭 값을 반환"""
@@ -31,6 +28,12 @@ def _get(row, *keys, default=""):
             return v
     return default
 
+def _latest_price(platform, product_number):
+    """스타일의 플랫폼별 마지막 판매가 ("$x.xx", 판매 이력 없으면 "NA")"""
+    key = str(product_number).upper().replace(" ", "")
+    hit = LATEST[platform].get(key)
+    return f"${hit[0]:.2f}" if hit else "NA"
+
 def _fmt_price(x):
     if x is None:
         return "-"
@@ -38,14 +41,20 @@ def _fmt_price(x):
     return "-" if s == "" or s.lower() in ["nan", "none"] else s
 
 st.title("📖 스타일 정보 조회")
-style_input = st.text_input("🔍 스타일 번호를 입력하세요:", "")
+style_input = st.text_input("🔍 스타일 번호 / 상품명 / 속성을 입력하세요:", "")
 if style_input:
-    matched = df_info[df_info["product number"].astype(str).str.contains(style_input, case=False, na=False)]
-    if matched.empty:
+    hits = SEARCH.search(style_input, limit=30)
+    if not hits:
         st.warning("❌ 해당 스타일을 찾을 수 없습니다.")
     else:
-        selected = st.selectbox("스타일 선택", matched["product number"].astype(str))
-        row = df_info[df_info["product number"] == selected].iloc[0]
+        # 순위순 후보 (상품번호 일치 → 접두 → 포함 → 상품명 → 속성)
+        names = df_info.get("default product name(en)", pd.Series("", index=df_info.index)).fillna("").astype(str)
+        pos = st.selectbox(
+            "스타일 선택", hits,
+            format_func=lambda i: f"{SEARCH.numbers[i]} · {names.iat[i]}" if names.iat[i] else SEARCH.numbers[i],
+        )
+        row = df_info.iloc[pos]
+        selected = row["product number"]
         image_url = str(row.get("image", "")).strip()
 
         # LIVE DATE 파싱 (대문자/소문자 모두 대응)
@@ -55,8 +64,8 @@ if style_input:
         shein_registered = pd.notna(shein_live)
 
         # 등록된 경우에만 최신가 조회
-        latest_temu  = get_latest_temu_price(df_temu, selected)   if temu_registered  else None
-        latest_shein = get_latest_shein_price(df_shein, selected) if shein_registered else None
+        latest_temu  = _latest_price("TEMU", selected)  if temu_registered  else None
+        latest_shein = _latest_price("SHEIN", selected) if shein_registered else None
 
         st.markdown("---")
         col1, col2 = st.columns([1, 2])
@@ -1,9 +1,10 @@
 # pages/2_세일즈_대시보드.py
 import streamlit as st
 import pandas as pd
-import re
-from dateutil import parser
 import altair as alt
+from utils import clean_money, ensure_series
+from sales_data import (load_sales_data, order_facts, daily_cube, range_totals, variant_table, slice_dates, STATUS_SOLD,
+                        comparison_windows, compare_periods, period_stats, period_totals)
 
 # =========================
 # Page
@@ -42,48 +43,6 @@ img.thumb { width:84px; height:auto; border-radius:12px; }
 # =========================
 # Helpers
 # =========================
-@st.cache_data(show_spinner=False)
-def load_google_sheet(sheet_name: str) -> pd.DataFrame:
-    import gspread
-    from oauth2client.service_account import ServiceAccountCredentials
-    import json
-    GOOGLE_SHEET_URL = "https://docs.google.com/spreadsheets/d/1oyVzCgGK1Q3Qi_sbYwE-wKG6SArnfUDRe7rQfGOF-Eo"
-    scope = ["https://spreadsheets.google.com/feeds","https://www.googleapis.com/auth/drive"]
-    creds_json = {k: str(v) for k, v in st.secrets["gcp_service_account"].items()}
-    with open("/tmp/service_account.json","w") as f: json.dump(creds_json, f)
-    creds = ServiceAccountCredentials.from_json_keyfile_name("/tmp/service_account.json", scope)
-    client = gspread.authorize(creds)
-    ws = client.open_by_url(GOOGLE_SHEET_URL).worksheet(sheet_name)
-    df = pd.DataFrame(ws.get_all_records())
-    df.columns = [c.lower().strip() for c in df.columns]
-    return df
-
-def parse_temudate(x):
-    s = str(x)
-    if "(" in s:
-        s = s.split("(")[0].strip()
-    try:
-        return parser.parse(s, fuzzy=True)
-    except Exception:
-        return pd.NaT
-
-def parse_sheindate(x):
-    try:
-        return pd.to_datetime(str(x), errors="coerce", infer_datetime_format=True)
-    except Exception:
-        return pd.NaT
-
-def clean_money(x) -> pd.Series:
-    s = x if isinstance(x, pd.Series) else pd.Series(x)
-    s = s.astype(str).str.replace(r"[^0-9.\-]", "", regex=True).replace("", pd.NA)
-    s = pd.to_numeric(s, errors="coerce")
-    return s
-
-def ensure_series(df: pd.DataFrame, col: str, default: float = 0.0) -> pd.Series:
-    if col in df.columns:
-        return df[col]
-    return pd.Series([default] * len(df), index=df.index, dtype=float)
-
 def _safe_minmax(*series):
     s = pd.concat([pd.to_datetime(x, errors="coerce") for x in series], ignore_index=True).dropna()
     if s.empty:
@@ -91,42 +50,13 @@ def _safe_minmax(*series):
         return t, t
     return s.min().date(), s.max().date()
 
-STYLE_RE = re.compile(r"\b([A-Z]{1,3}\d{3,5}[A-Z0-9]?)\b")
-
 def build_img_map(df_info: pd.DataFrame):
     keys = df_info["product number"].astype(str).str.upper().str.replace(" ", "", regex=False)
     return dict(zip(keys, df_info.get("image", pd.Series(index=df_info.index)).fillna("")))
 
-def style_key_from_label(label: str, img_map: dict) -> str | None:
-    s = str(label).strip().upper()
-    if not s:
-        return None
-    s_key = s.replace(" ", "")
-    if s_key in img_map:
-        return s_key
-    m = STYLE_RE.search(s)
-    if m:
-        cand = m.group(1).replace(" ", "")
-        if cand in img_map:
-            return cand
-    for k in img_map.keys():
-        if k in s_key:
-            return k
-    return None
-
 def img_tag(url):
     return f"<img src='{url}' class='thumb'>" if str(url).startswith("http") else ""
 
-# robust status helpers
-def temu_sold_mask(s: pd.Series) -> pd.Series:
-    return s.astype(str).str.lower().str.contains("shipped|delivered", regex=True, na=False)
-
-def temu_cancel_mask(s: pd.Series) -> pd.Series:
-    return s.astype(str).str.lower().str.contains("cancel", regex=True, na=False)
-
-def shein_refund_mask(s: pd.Series) -> pd.Series:
-    return s.astype(str).str.lower().str.contains("customer refunded", na=False)
-
 # SHEIN 프로모션 여부
 def shein_promo_mask(df: pd.DataFrame) -> pd.Series:
     c1 = ensure_series(df, "coupon discount", default=0.0)
@@ -139,59 +69,26 @@ def _normalize_style_input(s: str | None) -> str | None:
     if not s: return None
     return str(s).upper().replace(" ", "")
 
-# Style-key helpers
-def _style_key_series_temu(df: pd.DataFrame) -> pd.Series:
-    return df["product number"].astype(str).apply(lambda x: style_key_from_label(x, IMG_MAP))
-
-def _style_key_series_shein_fallback(df: pd.DataFrame) -> pd.Series:
-    return df["product description"].astype(str).apply(lambda x: style_key_from_label(x, IMG_MAP))
-
 def _short_title_mask(series: pd.Series, thresh:int=25) -> pd.Series:
     return series.astype(str).str.len().fillna(0) < thresh
 
 # =========================
 # 1) Load data
 # =========================
-df_temu  = load_google_sheet("TEMU_SALES")
-df_shein = load_google_sheet("SHEIN_SALES")
-df_info  = load_google_sheet("PRODUCT_INFO")
+# 날짜/수량/금액/상태 정규화와 style_key 는 sales_data 에서 1회 수행
+df_info, df_temu, df_shein = load_sales_data()
 IMG_MAP = build_img_map(df_info)
-
-# Normalize
-df_temu["order date"] = df_temu["purchase date"].apply(parse_temudate)
-df_shein["order date"] = df_shein["order processed on"].apply(parse_sheindate)
-
-df_temu["order item status"] = df_temu["order item status"].astype(str)
-df_temu["quantity shipped"] = pd.to_numeric(ensure_series(df_temu, "quantity shipped", 0.0), errors="coerce").fillna(0)
-df_temu["quantity purchased"] = pd.to_numeric(ensure_series(df_temu, "quantity purchased", 0.0), errors="coerce").fillna(0)
-df_temu["base price total"] = clean_money(ensure_series(df_temu, "base price total", 0.0)).fillna(0.0)
-
-df_shein["order status"] = df_shein["order status"].astype(str)
-df_shein["product price"] = clean_money(ensure_series(df_shein, "product price", 0.0)).fillna(0.0)
-
-# =========================
-# 1.5) SHEIN Seller SKU 파싱: "STYLE-COLOR-SIZE"
-# =========================
-if "seller sku" in df_shein.columns:
-    parts = df_shein["seller sku"].astype(str).str.split("-", n=2, expand=True)
-    df_shein["style_key"] = parts[0].str.upper().str.strip()
-    df_shein["color"] = parts[1].str.strip() if parts.shape[1] > 1 else ""
-    df_shein["size"]  = parts[2].str.strip() if parts.shape[1] > 2 else ""
-else:
-    df_shein["style_key"] = _style_key_series_shein_fallback(df_shein)
-    df_shein["color"] = ""
-    df_shein["size"]  = ""
-
-# TEMU color/size 보정
-if "color" not in df_temu.columns:
-    df_temu["color"] = ""
-if "size" not in df_temu.columns:
-    df_temu["size"] = ""
+# 양 플랫폼 통합 주문 행 (같은 컬럼·수량 의미, BOTH 는 platform 필터 생략)
+FACTS = order_facts()
+# 일 × 플랫폼 × 스타일 × 색상 × 사이즈 롤업 (SHEIN 색상/사이즈는 Seller SKU 에서 ingest 시 파싱)
+CUBE = daily_cube()
+# 플랫폼별 일 누적합: 기간 합계(KPI/전기간)는 배열 두 번 조회
+TOTALS = range_totals()
 
 # =========================
 # 2) Date Controls
 # =========================
-min_dt, max_dt = _safe_minmax(df_temu["order date"], df_shein["order date"])
+min_dt, max_dt = _safe_minmax(pd.Series([TOTALS["BOTH"].first_day, TOTALS["BOTH"].last_day]))
 today_ts = pd.Timestamp.today().normalize()
 
 def _clamp_date(d) -> pd.Timestamp.date:
@@ -255,54 +152,35 @@ if e_date < s_date: e_date = s_date
 start = pd.to_datetime(s_date)
 end   = pd.to_datetime(e_date) + pd.Timedelta(hours=23, minutes=59, seconds=59)
 
-period_days = (end - start).days + 1
-prev_start  = start - pd.Timedelta(days=period_days)
-prev_end    = start - pd.Timedelta(seconds=1)
+# cur / prev(직전 동일 길이) / wow / mom / yoy
+WINDOWS = comparison_windows(start, end)
 
 # =========================
 # 3) Aggregations
 # =========================
-def temu_agg(df, s, e):
-    d = df[(df["order date"] >= s) & (df["order date"] <= e)].copy()
-    stt = d["order item status"]
-    sold = d[temu_sold_mask(stt)]
-    qty_sum   = sold["quantity shipped"].sum()
-    sales_sum = sold["base price total"].sum()
-    aov       = (sales_sum / qty_sum) if qty_sum > 0 else 0.0
-    cancel_qty = d[temu_cancel_mask(stt)]["quantity purchased"].sum()
-    return sales_sum, qty_sum, aov, cancel_qty, sold
-
-def shein_agg(df, s, e):
-    d = df[(df["order date"] >= s) & (df["order date"] <= e)].copy()
-    stt = d["order status"]
-    sold = d[~shein_refund_mask(stt)]
-    qty_sum   = len(sold)
-    sales_sum = sold["product price"].sum()
+def cube_window(s, e, platform="BOTH"):
+    d = slice_dates(CUBE, s, e)
+    return d if platform == "BOTH" else d[d["platform"] == platform]
+
+def period_kpis(plat, period):
+    # 취소건: TEMU 는 취소수량, SHEIN 은 환불건 (BOTH 는 합산)
+    tot = TOTALS[plat].sum(*WINDOWS[period])
+    qty_sum   = tot["qty"]
+    sales_sum = tot["sales"]
     aov       = (sales_sum / qty_sum) if qty_sum > 0 else 0.0
-    cancel_qty = shein_refund_mask(stt).sum()
-    return sales_sum, qty_sum, aov, cancel_qty, sold
+    cancel_qty = tot["cancel_qty"] + tot["refund_cnt"]
+    return sales_sum, qty_sum, aov, cancel_qty
+
+# 모든 비교 구간의 스타일별 집계를 groupby 한 번으로
+STATS = compare_periods(WINDOWS, CUBE)
 
 # =========================
 # 4) Current vs Prev
 # =========================
-if platform == "TEMU":
-    sales_sum, qty_sum, aov, cancel_qty, df_sold = temu_agg(df_temu, start, end)
-    psales, pqty, paov, pcancel, p_sold = temu_agg(df_temu, prev_start, prev_end)
-elif platform == "SHEIN":
-    sales_sum, qty_sum, aov, cancel_qty, df_sold = shein_agg(df_shein, start, end)
-    psales, pqty, paov, pcancel, p_sold = shein_agg(df_shein, prev_start, prev_end)
-else:
-    s1, q1, a1, c1, d1 = temu_agg(df_temu, start, end)
-    s2, q2, a2, c2, d2 = shein_agg(df_shein, start, end)
-    sales_sum, qty_sum, cancel_qty = s1 + s2, q1 + q2, c1 + c2
-    aov = sales_sum / qty_sum if qty_sum > 0 else 0.0
-    df_sold = pd.concat([d1, d2], ignore_index=True)
-
-    ps1, pq1, pa1, pc1, d1p = temu_agg(df_temu, prev_start, prev_end)
-    ps2, pq2, pa2, pc2, d2p = shein_agg(df_shein, prev_start, prev_end)
-    psales, pqty, pcancel = ps1 + ps2, pq1 + pq2, pc1 + pc2
-    paov = psales / pqty if pqty > 0 else 0.0
-    p_sold = pd.concat([d1p, d2p], ignore_index=True)
+sales_sum, qty_sum, aov, cancel_qty = period_kpis(platform, "cur")
+psales, pqty, paov, pcancel = period_kpis(platform, "prev")
+cur_style  = period_stats(STATS, "cur", platform)
+prev_style = period_stats(STATS, "prev", platform)
 
 # =========================
 # ⭐ Style Search (스타일번호 검색) + 색상/사이즈/페어 상세
@@ -343,75 +221,40 @@ with st.container(border=True):
         if not skey:
             st.warning("유효한 스타일번호를 입력하세요.")
         else:
+            # 통합 주문 팩트에서 스타일·기간·플랫폼 필터 1회 (qty: TEMU shipped 합 / SHEIN 건수)
+            f = slice_dates(FACTS, start, end)
+            f = f[(f["style_key"] == skey) & (f["status_code"] == STATUS_SOLD)]
+            if platform != "BOTH":
+                f = f[f["platform"] == platform]
+            total_qty   = int(f["qty"].sum())
+            total_sales = float(f["sales"].sum())
+
+            # 색상/사이즈 믹스는 변형 테이블에서 스타일 1회 조회
+            style_var = variant_table().style(skey, start, end, platform)
+            temu_df_filtered = style_var[style_var["platform"] == "TEMU"]
+            shein_df_filtered = style_var[style_var["platform"] == "SHEIN"]
+
             res_tables = []
-            total_sales = 0.0
-            total_qty   = 0
-            temu_df_filtered = pd.DataFrame()
-            shein_df_filtered = pd.DataFrame()
-
-            # TEMU
-            if platform in ("TEMU", "BOTH"):
-                t = df_temu[(df_temu["order date"]>=start)&(df_temu["order date"]<=end)].copy()
-                t = t[temu_sold_mask(t["order item status"])].copy()
-                t["style_key"] = _style_key_series_temu(t)
-                t = t[t["style_key"] == skey]
-                temu_df_filtered = t.copy()
-                if not t.empty:
-                    qty = t["quantity shipped"].sum()
-                    sales = t["base price total"].sum()
-                    total_qty += int(qty)
-                    total_sales += float(sales)
-                    t_daily = (
-                        t.groupby(pd.Grouper(key="order date", freq="D"))
-                         .agg(qty=("quantity shipped","sum"), sales=("base price total","sum"))
-                         .reset_index()
-                    )
-                    t_table = t[["order date","product number","color","size","quantity shipped","base price total"]].rename(
-                        columns={"product number":"Product", "quantity shipped":"Qty", "base price total":"Sales"}
-                    )
-                    res_tables.append(("TEMU", t_daily, t_table))
-
-            # SHEIN (Seller SKU 파싱 사용)
-            if platform in ("SHEIN", "BOTH"):
-                s = df_shein[(df_shein["order date"]>=start)&(df_shein["order date"]<=end)].copy()
-                s = s[~shein_refund_mask(s["order status"])].copy()
-                s = s[s["style_key"] == skey]
-                shein_df_filtered = s.copy()
-                if not s.empty:
-                    qty = len(s)  # 건수
-                    sales = s["product price"].sum()
-                    total_qty += int(qty)
-                    total_sales += float(sales)
-                    s["qty"] = 1
-                    s_daily = (
-                        s.groupby(pd.Grouper(key="order date", freq="D"))
-                         .agg(qty=("qty","sum"), sales=("product price","sum"))
-                         .reset_index()
-                    )
-                    s_table = s[["order date","product description","color","size","product price"]].rename(
-                        columns={"product description":"Product", "product price":"Sales"}
-                    )
-                    res_tables.append(("SHEIN", s_daily, s_table))
+            for label, g in f.groupby("platform", sort=False):
+                daily = (g.groupby(pd.Grouper(key="order date", freq="D"))
+                          .agg(qty=("qty","sum"), sales=("sales","sum"))
+                          .reset_index())
+                table = g[["order date","product","color","size","qty","sales"]].rename(
+                    columns={"product":"Product", "qty":"Qty", "sales":"Sales"}
+                )
+                res_tables.append((label, daily, table))
+            res_tables.sort(key=lambda x: ["TEMU", "SHEIN"].index(x[0]))
 
             if total_qty == 0:
                 st.info("해당 기간/플랫폼에서 일치하는 스타일 판매가 없습니다.")
             else:
                 # 플랫폼별 요약
-                plat_rows = []
-                for label, _daily_df, table in res_tables:
-                    if label == "TEMU":
-                        p_qty = int(table["Qty"].sum()) if "Qty" in table.columns else 0
-                        p_sales = float(table["Sales"].sum()) if "Sales" in table.columns else 0.0
-                    else:
-                        p_qty = int(len(table))
-                        p_sales = float(table["Sales"].sum()) if "Sales" in table.columns else 0.0
-                    plat_rows.append({
-                        "Platform": label,
-                        "Sales": p_sales,
-                        "Qty": p_qty,
-                        "AOV": (p_sales / p_qty) if p_qty > 0 else 0.0
-                    })
-                plat_df = pd.DataFrame(plat_rows).sort_values("Sales", ascending=False)
+                plat_df = (f.groupby("platform")[["sales","qty"]].sum()
+                            .rename(columns={"sales":"Sales", "qty":"Qty"})
+                            .rename_axis("Platform").reset_index())
+                plat_df["Qty"] = plat_df["Qty"].astype(int)
+                plat_df["AOV"] = (plat_df["Sales"] / plat_df["Qty"].where(plat_df["Qty"] > 0)).fillna(0.0)
+                plat_df = plat_df.sort_values("Sales", ascending=False)
 
                 # 총계 KPI
                 aov = total_sales / total_qty if total_qty > 0 else 0.0
@@ -454,25 +297,16 @@ with st.container(border=True):
                 st.divider()
                 st.markdown("### 스타일 세부 판매 (색상 · 사이즈)")
 
-                def _agg_variant_temudf(df: pd.DataFrame):
-                    if df.empty: 
-                        return pd.DataFrame(), pd.DataFrame()
-                    cdf = df.groupby("color")["quantity shipped"].sum().reset_index().rename(columns={"quantity shipped":"Qty"})
-                    sdf = df.groupby("size")["quantity shipped"].sum().reset_index().rename(columns={"quantity shipped":"Qty"})
-                    cdf = cdf.sort_values("Qty", ascending=False)
-                    sdf = sdf.sort_values("Qty", ascending=False)
-                    return cdf, sdf
-
-                def _agg_variant_sheindf(df: pd.DataFrame):
+                def _agg_variant(df: pd.DataFrame):
                     if df.empty:
                         return pd.DataFrame(), pd.DataFrame()
-                    cdf = df.groupby("color").size().reset_index(name="Qty").sort_values("Qty", ascending=False)
-                    sdf = df.groupby("size").size().reset_index(name="Qty").sort_values("Qty", ascending=False)
+                    cdf = df.groupby("color")["qty"].sum().astype(int).reset_index(name="Qty").sort_values("Qty", ascending=False)
+                    sdf = df.groupby("size")["qty"].sum().astype(int).reset_index(name="Qty").sort_values("Qty", ascending=False)
                     return cdf, sdf
 
                 if not shein_df_filtered.empty:
                     st.markdown("**SHEIN 변형 판매**")
-                    cdf, sdf = _agg_variant_sheindf(shein_df_filtered)
+                    cdf, sdf = _agg_variant(shein_df_filtered)
                     cols = st.columns(2)
                     with cols[0]:
                         if not cdf.empty:
@@ -489,7 +323,7 @@ with st.container(border=True):
 
                 if not temu_df_filtered.empty:
                     st.markdown("**TEMU 변형 판매**")
-                    cdf, sdf = _agg_variant_temudf(temu_df_filtered)
+                    cdf, sdf = _agg_variant(temu_df_filtered)
                     cols = st.columns(2)
                     with cols[0]:
                         if not cdf.empty:
@@ -508,57 +342,28 @@ with st.container(border=True):
                 st.divider()
                 st.markdown("### 스타일 세부 판매 (색상-사이즈 묶음)")
 
-                def _pair_label(c, s):
-                    c = ("" if pd.isna(c) else str(c).strip())
-                    s = ("" if pd.isna(s) else str(s).strip())
-                    if c and s: return f"{c} / {s}"
-                    if c: return c
-                    if s: return s
-                    return "(미지정)"
+                def _pair_mix(df: pd.DataFrame) -> pd.DataFrame:
+                    return (df.groupby("pair")["qty"].sum().astype(int).reset_index(name="Qty")
+                              .sort_values("Qty", ascending=False))
 
                 # SHEIN: 건수
                 if not shein_df_filtered.empty:
                     st.markdown("**SHEIN · Color-Size Mix**")
-                    pairs = (shein_df_filtered
-                             .assign(pair=lambda d: d.apply(lambda r: _pair_label(r.get("color",""), r.get("size","")), axis=1))
-                             .groupby("pair").size().reset_index(name="Qty")
-                             .sort_values("Qty", ascending=False))
+                    pairs = _pair_mix(shein_df_filtered)
                     st.dataframe(pairs, use_container_width=True)
                     _donut_chart(pairs.head(12)["pair"], pairs.head(12)["Qty"], "SHEIN · Color-Size Mix")
 
                 # TEMU: shipped 합
                 if not temu_df_filtered.empty:
                     st.markdown("**TEMU · Color-Size Mix**")
-                    if "quantity shipped" not in temu_df_filtered.columns:
-                        temu_df_filtered = temu_df_filtered.assign(**{"quantity shipped": 0})
-                    pairs = (temu_df_filtered
-                             .assign(pair=lambda d: d.apply(lambda r: _pair_label(r.get("color",""), r.get("size","")), axis=1))
-                             .groupby("pair")["quantity shipped"].sum().reset_index()
-                             .rename(columns={"quantity shipped":"Qty"})
-                             .sort_values("Qty", ascending=False))
+                    pairs = _pair_mix(temu_df_filtered)
                     st.dataframe(pairs, use_container_width=True)
                     _donut_chart(pairs.head(12)["pair"], pairs.head(12)["Qty"], "TEMU · Color-Size Mix")
 
                 # BOTH 통합
                 if platform == "BOTH" and (not shein_df_filtered.empty or not temu_df_filtered.empty):
                     st.markdown("**ALL · Color-Size Mix (선택된 플랫폼 전체)**")
-                    merged = []
-                    if not temu_df_filtered.empty:
-                        ttmp = temu_df_filtered.copy()
-                        ttmp["__platform__"] = "TEMU"
-                        merged.append(ttmp)
-                    if not shein_df_filtered.empty:
-                        stmp = shein_df_filtered.copy()
-                        stmp["__platform__"] = "SHEIN"
-                        merged.append(stmp)
-                    M = pd.concat(merged, ignore_index=True)
-                    if "quantity shipped" not in M.columns:
-                        M["quantity shipped"] = 0
-                    M.loc[M["__platform__"] == "SHEIN", "quantity shipped"] = 1
-                    pairs_all = (M.assign(pair=lambda d: d.apply(lambda r: _pair_label(r.get("color",""), r.get("size","")), axis=1))
-                                   .groupby("pair")["quantity shipped"].sum().reset_index()
-                                   .rename(columns={"quantity shipped":"Qty"})
-                                   .sort_values("Qty", ascending=False))
+                    pairs_all = _pair_mix(style_var)
                     st.dataframe(pairs_all, use_container_width=True)
                     _donut_chart(pairs_all.head(12)["pair"], pairs_all.head(12)["Qty"], "ALL · Color-Size Mix")
 
@@ -592,31 +397,14 @@ def _pc(cur, prev):
         return None
     return (cur - prev) / prev * 100.0
 
-def get_bestseller_labels(platform, df_sold, s, e):
-    if platform == "TEMU":
-        best = df_sold.groupby("product number")["quantity shipped"].sum().sort_values(ascending=False).head(10)
-        return list(best.index.astype(str))
-    elif platform == "SHEIN":
-        tmp = df_sold.copy(); tmp["qty"] = 1
-        best = tmp.groupby("product description")["qty"].sum().sort_values(ascending=False).head(10)
-        return list(best.index.astype(str))
-    else:
-        t = df_temu[(df_temu["order date"]>=s)&(df_temu["order date"]<=e)]
-        t = t[temu_sold_mask(t["order item status"])].copy()
-        t["style_key"] = t["product number"].astype(str).apply(lambda x: style_key_from_label(x, IMG_MAP))
-        t = t.dropna(subset=["style_key"])
-        t_cnt = t.groupby("style_key")["quantity shipped"].sum()
-        s2 = df_shein[(df_shein["order date"]>=s)&(df_shein["order date"]<=e)]
-        s2 = s2[~shein_refund_mask(s2["order status"])].copy()
-        s2["style_key"] = s2["product description"].astype(str).apply(lambda x: style_key_from_label(x, IMG_MAP))
-        s2 = s2.dropna(subset=["style_key"])
-        s_cnt = s2.groupby("style_key").size()
-        mix = (pd.DataFrame({"t":t_cnt, "s":s_cnt}).fillna(0))
-        mix["tot"] = mix["t"] + mix["s"]
-        return list(mix["tot"].sort_values(ascending=False).head(10).index.astype(str))
-
-cur_top = get_bestseller_labels(platform, df_sold, start, end)
-prev_top = get_bestseller_labels(platform, locals().get("p_sold", pd.DataFrame()), prev_start, prev_end) if 'p_sold' in locals() else []
+def get_bestseller_labels(style_df):
+    # style_df: period_stats 결과 → 판매수량 Top10 스타일
+    sold = style_df[style_df["sold_cnt"] > 0]
+    best = sold["qty"].sort_values(ascending=False).head(10)
+    return list(best.index.astype(str))
+
+cur_top = get_bestseller_labels(cur_style)
+prev_top = get_bestseller_labels(prev_style)
 entered = [x for x in cur_top if x not in prev_top]
 dropped = [x for x in prev_top if x not in cur_top]
 
@@ -632,6 +420,13 @@ for label, now, prev in [
         dir_ = "증가" if v >= 0 else "감소"
         bullets.append(f"• {label} **{dir_} {abs(v):.1f}%**")
 
+# 동기간 비교 (같은 STATS 에서 추가 스캔 없이)
+for label, period in [("전주 동기간", "wow"), ("전월 동기간", "mom"), ("전년 동기간", "yoy")]:
+    v = _pc(sales_sum, period_totals(STATS, period, platform)["sales"])
+    if v is not None:
+        dir_ = "증가" if v >= 0 else "감소"
+        bullets.append(f"• 매출 {label} 대비 **{dir_} {abs(v):.1f}%**")
+
 if entered:
     bullets.append(f"• Top10 **신규 진입**: {', '.join(entered[:5])} → 재고/광고 예산 소폭 증액")
 if dropped:
@@ -640,8 +435,8 @@ if dropped:
 # SHEIN 프로모션 인사이트
 try:
     if platform in ("SHEIN", "BOTH"):
-        shein_cur = df_shein[(df_shein["order date"] >= start) & (df_shein["order date"] <= end)]
-        shein_cur = shein_cur[~shein_refund_mask(shein_cur["order status"])].copy()
+        shein_cur = slice_dates(df_shein, start, end)
+        shein_cur = shein_cur[shein_cur["status_code"] == STATUS_SOLD].copy()
         if not shein_cur.empty:
             p_mask = shein_promo_mask(shein_cur)
             total_orders = len(shein_cur)
@@ -666,40 +461,25 @@ with st.container(border=True):
 
     actions = []
 
-    # 현재/전기간 스타일별 수량 집계
-    t_cur = df_temu[(df_temu["order date"]>=start)&(df_temu["order date"]<=end)].copy()
-    t_cur["style_key"] = _style_key_series_temu(t_cur)
-    t_cur_sold = t_cur[temu_sold_mask(t_cur["order item status"])].dropna(subset=["style_key"])
-    t_cur_qty = t_cur_sold.groupby("style_key")["quantity shipped"].sum().astype(int)
-
-    s_cur = df_shein[(df_shein["order date"]>=start)&(df_shein["order date"]<=end)].copy()
-    s_cur_sold = s_cur[~shein_refund_mask(s_cur["order status"])].dropna(subset=["style_key"])
-    s_cur_qty = s_cur_sold.groupby("style_key").size().astype(int)
-
-    t_prev = df_temu[(df_temu["order date"]>=prev_start)&(df_temu["order date"]<=prev_end)].copy()
-    t_prev["style_key"] = _style_key_series_temu(t_prev)
-    t_prev_sold = t_prev[temu_sold_mask(t_prev["order item status"])].dropna(subset=["style_key"])
-    t_prev_qty = t_prev_sold.groupby("style_key")["quantity shipped"].sum().astype(int)
-
-    s_prev = df_shein[(df_shein["order date"]>=prev_start)&(df_shein["order date"]<=prev_end)].copy()
-    s_prev_sold = s_prev[~shein_refund_mask(s_prev["order status"])].dropna(subset=["style_key"])
-    s_prev_qty = s_prev_sold.groupby("style_key").size().astype(int)
+    # 현재/전기간 스타일별 집계 (STATS, style_key 없는 행 제외)
+    t_cur, s_cur = period_stats(STATS, "cur", "TEMU"), period_stats(STATS, "cur", "SHEIN")
+    t_prev, s_prev = period_stats(STATS, "prev", "TEMU"), period_stats(STATS, "prev", "SHEIN")
+    t_cur_qty = t_cur.loc[t_cur["sold_cnt"] > 0, "qty"].astype(int)
+    s_cur_qty = s_cur.loc[s_cur["sold_cnt"] > 0, "qty"].astype(int)
+    t_prev_qty = t_prev.loc[t_prev["sold_cnt"] > 0, "qty"].astype(int)
+    s_prev_qty = s_prev.loc[s_prev["sold_cnt"] > 0, "qty"].astype(int)
 
     # 1) SHEIN 환불비율 높은 스타일
     if not s_cur.empty:
-        s_all_cur = s_cur.dropna(subset=["style_key"]).copy()
-        s_all_cur["is_refund"] = shein_refund_mask(s_all_cur["order status"])
-        refund_stats = s_all_cur.groupby("style_key")["is_refund"].mean().sort_values(ascending=False)
+        refund_stats = (s_cur["refund_cnt"] / s_cur["qty_purchased"]).sort_values(ascending=False)
         high_refund = refund_stats[refund_stats >= 0.15].head(5)
         for sk, r in high_refund.items():
             actions.append(f"SHEIN 환불률 높음({r*100:.0f}%): {sk} → PDP 설명/사이즈 안내 보강 & 리뷰 상단 고정")
 
     # 2) TEMU 취소비율 높은 스타일
     if not t_cur.empty:
-        t_all_cur = t_cur.dropna(subset=["style_key"]).copy()
-        t_all_cur["is_cancel"] = temu_cancel_mask(t_all_cur["order item status"])
-        qty_purchased = t_all_cur.groupby("style_key")["quantity purchased"].sum().replace(0, pd.NA)
-        cancel_cnt = t_all_cur.groupby("style_key")["is_cancel"].sum()
+        qty_purchased = t_cur["qty_purchased"].replace(0, pd.NA)
+        cancel_cnt = t_cur["cancel_cnt"]
         cancel_rate = (cancel_cnt / qty_purchased).fillna(cancel_cnt / cancel_cnt.where(cancel_cnt==0, other=1)).sort_values(ascending=False)
         high_cancel = cancel_rate[cancel_rate >= 0.10].head(5)
         for sk, r in high_cancel.items():
@@ -725,19 +505,18 @@ with st.container(border=True):
         actions.append(f"Top10 이탈: {sk} → 광고·노출 재강화 및 경쟁가 점검")
 
     # 5) 이미지 누락
-    top_s = s_cur_sold.groupby("style_key").size().sort_values(ascending=False).head(20)
+    top_s = s_cur_qty.sort_values(ascending=False).head(20)
     for sk in [sk for sk in top_s.index if not IMG_MAP.get(sk)][:5]:
         actions.append(f"SHEIN 이미지 없음: {sk} → 썸네일 업로드/교체")
-    top_t = t_cur_sold.groupby("style_key")["quantity shipped"].sum().sort_values(ascending=False).head(20)
+    top_t = t_cur_qty.sort_values(ascending=False).head(20)
     for sk in [sk for sk in top_t.index if not IMG_MAP.get(sk)][:5]:
         actions.append(f"TEMU 이미지 없음: {sk} → 썸네일 업로드/교체")
 
-    # 6) 타이틀 짧은 상품
-    if not s_cur_sold.empty and "product description" in s_cur_sold.columns:
-        s_cur_sold = s_cur_sold.assign(
-            short_title=_short_title_mask(s_cur_sold["product description"], 25),
-            style_key=s_cur_sold["style_key"]
-        ).dropna(subset=["style_key"])
+    # 6) 타이틀 짧은 상품 (상품명이 필요해 주문 팩트 행 사용)
+    s_cur_sold = slice_dates(FACTS, start, end)
+    s_cur_sold = s_cur_sold[(s_cur_sold["platform"] == "SHEIN") & (s_cur_sold["status_code"] == STATUS_SOLD)].dropna(subset=["style_key"])
+    if not s_cur_sold.empty:
+        s_cur_sold = s_cur_sold.assign(short_title=_short_title_mask(s_cur_sold["title"], 25))
         short_candidates = (
             s_cur_sold[s_cur_sold["short_title"]]
             .groupby("style_key").size()
@@ -764,35 +543,11 @@ with st.container(border=True):
 # 8) Daily Chart
 # =========================
 def build_daily(platform: str, s: pd.Timestamp, e: pd.Timestamp) -> pd.DataFrame:
-    if platform == "TEMU":
-        t = df_temu[(df_temu["order date"]>=s)&(df_temu["order date"]<=e)]
-        t = t[temu_sold_mask(df_temu["order item status"])]
-        daily = t.groupby(pd.Grouper(key="order date", freq="D")).agg(
-            qty=("quantity shipped","sum"), Total_Sales=("base price total","sum")
-        )
-    elif platform == "SHEIN":
-        s2 = df_shein[(df_shein["order date"]>=s)&(df_shein["order date"]<=e)]
-        s2 = s2[~shein_refund_mask(df_shein["order status"])]
-        s2["qty"] = 1
-        daily = s2.groupby(pd.Grouper(key="order date", freq="D")).agg(
-            qty=("qty","sum"), Total_Sales=("product price","sum")
-        )
-    else:
-        t = df_temu[(df_temu["order date"]>=s)&(df_temu["order date"]<=e)]
-        t = t[temu_sold_mask(df_temu["order item status"])].copy()
-        s2 = df_shein[(df_shein["order date"]>=s)&(df_shein["order date"]<=e)]
-        s2 = s2[~shein_refund_mask(s2["order status"])].copy()
-        s2["qty"] = 1
-        t_daily = t.groupby(pd.Grouper(key="order date", freq="D")).agg(
-            t_qty=("quantity shipped","sum"), t_sales=("base price total","sum")
-        )
-        s_daily = s2.groupby(pd.Grouper(key="order date", freq="D")).agg(
-            s_qty=("qty","sum"), s_sales=("product price","sum")
-        )
-        daily = pd.concat([t_daily, s_daily], axis=1).fillna(0.0)
-        daily["qty"] = daily["t_qty"] + daily["s_qty"]
-        daily["Total_Sales"] = daily["t_sales"] + daily["s_sales"]
-        daily = daily[["qty","Total_Sales"]]
+    d = cube_window(s, e, platform)
+    d = d[d["sold_cnt"] > 0]
+    daily = d.groupby(pd.Grouper(key="order date", freq="D")).agg(
+        qty=("qty","sum"), Total_Sales=("sales","sum")
+    )
     return daily.reset_index().set_index("order date").fillna(0.0)
 
 st.markdown("<div class='block-title'>일별 판매 추이</div>", unsafe_allow_html=True)
@@ -808,42 +563,19 @@ else:
 # =========================
 st.subheader("Best Seller 10")
 
-def best_table(platform, df_sold, s, e):
-    if platform == "TEMU":
-        g = (
-            df_sold.assign(style_key=lambda d: d["product number"].astype(str)
-                           .apply(lambda x: style_key_from_label(x, IMG_MAP)))
-               .dropna(subset=["style_key"])
-               .groupby("style_key")["quantity shipped"].sum().astype(int).reset_index()
-        )
-        g = g.rename(columns={"style_key":"Style Number","quantity shipped":"Sold Qty"})
-        g["Image"] = g["Style Number"].apply(lambda x: img_tag(IMG_MAP.get(x, "")))
-        return g[["Image","Style Number","Sold Qty"]].sort_values("Sold Qty", ascending=False).head(10)
+def _sold_qty(style_df):
+    return style_df.loc[style_df["sold_cnt"] > 0, "qty"].astype(int)
 
-    if platform == "SHEIN":
-        tmp = df_sold.copy(); tmp["qty"] = 1
-        g = (
-            tmp.assign(style_key=lambda d: d["product description"].astype(str)
-                       .apply(lambda x: style_key_from_label(x, IMG_MAP)))
-               .dropna(subset=["style_key"])
-               .groupby("style_key")["qty"].sum().astype(int).reset_index()
-        )
+def best_table(platform):
+    if platform in ("TEMU", "SHEIN"):
+        g = _sold_qty(cur_style).rename_axis("style_key").reset_index()
         g = g.rename(columns={"style_key":"Style Number","qty":"Sold Qty"})
         g["Image"] = g["Style Number"].apply(lambda x: img_tag(IMG_MAP.get(x, "")))
         return g[["Image","Style Number","Sold Qty"]].sort_values("Sold Qty", ascending=False).head(10)
 
     # BOTH
-    t = df_temu[(df_temu["order date"]>=s)&(df_temu["order date"]<=e)&
-                (temu_sold_mask(df_temu["order item status"]))].copy()
-    t["style_key"] = t["product number"].astype(str).apply(lambda x: style_key_from_label(x, IMG_MAP))
-    t = t.dropna(subset=["style_key"])
-    t_group = t.groupby("style_key")["quantity shipped"].sum().astype(int)
-
-    s2 = df_shein[(df_shein["order date"]>=s)&(df_shein["order date"]<=e)&
-                  (~shein_refund_mask(df_shein["order status"]))].copy()
-    s2["style_key"] = s2["product description"].astype(str).apply(lambda x: style_key_from_label(x, IMG_MAP))
-    s2 = s2.dropna(subset=["style_key"])
-    s_group = s2.groupby("style_key").size().astype(int)
+    t_group = _sold_qty(period_stats(STATS, "cur", "TEMU"))
+    s_group = _sold_qty(period_stats(STATS, "cur", "SHEIN"))
 
     mix = pd.DataFrame({"TEMU Qty": t_group, "SHEIN Qty": s_group}).fillna(0).astype(int)
     mix["Sold Qty"] = (mix["TEMU Qty"] + mix["SHEIN Qty"]).astype(int)
@@ -867,6 +599,6 @@ def best_table(platform, df_sold, s, e):
     mix["Platform Mix"] = mix.apply(badge_row, axis=1)
     return mix[["Image","Style Number","Sold Qty","Platform Mix","TEMU Qty","SHEIN Qty"]]
 
-best_df = best_table(platform, df_sold, start, end)
+best_df = best_table(platform)
 with st.container(border=True):
     st.markdown(best_df.to_html(escape=False, index=False), unsafe_allow_html=True)
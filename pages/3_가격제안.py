@@ -4,8 +4,11 @@
 # ==========================================
 import streamlit as st
 import pandas as pd
+import itertools
+from functools import reduce
 import numpy as np
-from dateutil import parser
+from sklearn.neighbors import BallTree
+from sales_data import load_sales_data, daily_cube, data_version, compare_periods, period_stats
 
 # -------------------------
 # 기본 설정
@@ -26,12 +29,6 @@ def safe_float(x):
     except Exception:
         return np.nan
 
-def money_to_float_series(s: pd.Series) -> pd.Series:
-    return pd.to_numeric(
-        s.astype(str).str.replace(r"[^0-9.\-]", "", regex=True),
-        errors="coerce"
-    ).fillna(0.0)
-
 def show_price(val):
     try:
         x = float(val)
@@ -46,56 +43,9 @@ def make_img_tag(url):
         return f"<img src='{url}' style='width:56px;height:auto;border-radius:8px;'>"
     return ""
 
-def parse_temudate(dt):
-    try:
-        return parser.parse(str(dt).split("(")[0].strip(), fuzzy=True)
-    except Exception:
-        return pd.NaT
-
-def parse_sheindate(dt):
-    try:
-        return pd.to_datetime(str(dt), errors="coerce", infer_datetime_format=True)
-    except Exception:
-        return pd.NaT
-
-@st.cache_data(show_spinner=False)
-def load_google_sheet(sheet_name):
-    import gspread
-    from oauth2client.service_account import ServiceAccountCredentials
-    import json
-    GOOGLE_SHEET_URL = "https://docs.google.com/spreadsheets/d/1oyVzCgGK1Q3Qi_sbYwE-wKG6SArnfUDRe7rQfGOF-Eo"
-    scope = [
-        "https://spreadsheets.google.com/feeds",
-        "https://www.googleapis.com/auth/drive"
-    ]
-    json_data = {k: str(v) for k, v in st.secrets["gcp_service_account"].items()}
-    with open("/tmp/service_account.json", "w") as f:
-        json.dump(json_data, f)
-    creds = ServiceAccountCredentials.from_json_keyfile_name("/tmp/service_account.json", scope)
-    client = gspread.authorize(creds)
-    ws = client.open_by_url(GOOGLE_SHEET_URL).worksheet(sheet_name)
-    df = pd.DataFrame(ws.get_all_records())
-    df.columns = [c.lower().strip() for c in df.columns]
-    return df
-
 # ===================== 데이터 로드 =====================
-df_info  = load_google_sheet("PRODUCT_INFO")
-df_temu  = load_google_sheet("TEMU_SALES")
-df_shein = load_google_sheet("SHEIN_SALES")
-
-# 날짜 정규화
-df_temu["order date"]  = df_temu["purchase date"].apply(parse_temudate)
-df_shein["order date"] = df_shein["order processed on"].apply(parse_sheindate)
-
-# 숫자/상태 정규화
-df_temu["order item status"] = df_temu["order item status"].astype(str)
-df_temu["quantity shipped"]  = pd.to_numeric(df_temu.get("quantity shipped", 0), errors="coerce").fillna(0.0)
-if "base price total" in df_temu.columns:
-    df_temu["base price total"] = money_to_float_series(df_temu["base price total"])
-
-df_shein["order status"]   = df_shein["order status"].astype(str)
-if "product price" in df_shein.columns:
-    df_shein["product price"] = money_to_float_series(df_shein["product price"])
+# 날짜/숫자/상태 정규화는 sales_data 에서 1회 수행
+df_info, df_temu, df_shein = load_sales_data()
 
 # 이미지 맵 & ERP
 img_dict = dict(zip(df_info.get("product number", pd.Series(dtype=str)).astype(str), df_info.get("image", "")))
@@ -126,30 +76,34 @@ platform_view = st.radio("플랫폼", options=["TEMU", "SHEIN"], horizontal=True
 
 st.caption(f"성숙 기준: 등록 후 **{MATURE_DAYS}일** 경과된 상품만 분석 (등록일은 PRODUCT_INFO 시트의 TEMU_LIVE_DATE / SHEIN_LIVE_DATE 사용)")
 
-# ===================== 플랫폼별 현재가 =====================
-def temu_now_num(style):
-    vals = df_temu[df_temu["product number"].astype(str) == str(style)]["base price total"]
-    vals = vals[vals > 0]
-    return float(vals.mean()) if len(vals) > 0 else np.nan
-
-def shein_now_num(style):
-    vals = df_shein[df_shein["product description"].astype(str) == str(style)]["product price"]
-    vals = vals[vals > 0]
-    return float(vals.mean()) if len(vals) > 0 else np.nan
-
-# ===================== 판매 집계(최근/직전 30일) =====================
-def get_qty(df, style, s, e, platform):
-    """플랫폼별 수량 집계 (TEMU는 quantity shipped, SHEIN은 건수 1)"""
-    if platform == "TEMU":
-        d = df[(df["product number"].astype(str) == str(style)) &
-               (df["order date"] >= s) & (df["order date"] <= e) &
-               (df["order item status"].str.lower().isin(["shipped", "delivered"]))].copy()
-        return pd.to_numeric(d["quantity shipped"], errors="coerce").fillna(0).sum()
-    else:
-        d = df[(df["product description"].astype(str) == str(style)) &
-               (df["order date"] >= s) & (df["order date"] <= e) &
-               (~df["order status"].str.lower().eq("customer refunded"))].copy()
-        return d.shape[0]
+# ===================== 스타일별 집계 (플랫폼당 groupby 1회) =====================
+PRICE_COL = {"TEMU": "base price total", "SHEIN": "product price"}
+
+def price_stats(df: pd.DataFrame, price_col: str) -> pd.DataFrame:
+    """style_key 별 가격 합/건수 (전체 행, pos: 0 초과 가격만)"""
+    price = df[price_col]
+    pos = price.where(price > 0)
+    return pd.DataFrame({
+        "sum": price.groupby(df["style_key"]).sum(),
+        "cnt": price.groupby(df["style_key"]).count(),
+        "pos_sum": pos.groupby(df["style_key"]).sum(),
+        "pos_cnt": pos.groupby(df["style_key"]).count(),
+    })
+
+def now_price(stats: pd.DataFrame) -> pd.Series:
+    """현재가: 0 초과 가격 평균"""
+    return stats["pos_sum"] / stats["pos_cnt"].replace(0, np.nan)
+
+@st.cache_data(show_spinner=False)
+def platform_price_stats(version: str) -> dict:
+    """플랫폼별 (스타일별 가격 집계, 전체 합, 전체 건수) — 데이터 버전(새로고침)마다 1회 계산"""
+    out = {}
+    for plat, df in (("TEMU", df_temu), ("SHEIN", df_shein)):
+        col = PRICE_COL[plat]
+        out[plat] = (price_stats(df, col), float(df[col].sum()), int(df[col].count()))
+    return out
+
+PRICE_STATS = platform_price_stats(data_version())
 
 # ===================== 추천가 로직 =====================
 PLATFORM_CFG = {
@@ -157,187 +111,201 @@ PLATFORM_CFG = {
     "SHEIN": {"fee_rate": 0.15, "extra_fee": 0.0, "base_add": 7, "min_add": 2, "floor": 9},
 }
 
-def suggest_price_platform(erp, cur_price, comp_prices, mode, cfg):
+# 튜닝값
+PRICE_TUNING = {
+    "BEAT_BY_SLOW":   0.20,  # 경쟁가보다 이만큼 싸게(슬로우/보통)
+    "BEAT_BY_DROP":   0.50,  # 급감은 더 크게
+    "DISC_SLOW":      0.03,  # 현재가 대비 3% 인하(슬로우)
+    "DISC_DROP":      0.10,  # 현재가 대비 10% 인하(급감)
+    "UPLIFT_HOT_PCT": 0.05,  # 핫: 최소 5% 인상
+    "UPLIFT_HOT_ABS": 0.50,  # 핫: 혹은 최소 +$0.5 인상
+    "BEAT_UPWARDS":   1.00,  # 핫: 경쟁가를 +$1 넘겨서 적정가 앵커링
+}
+
+def suggest_price_platform(erp, cur_price, comp_prices, mode, cfg, tune=PRICE_TUNING):
     """
-    erp: float
-    cur_price: 현재 우리 플랫폼가(숫자, NaN 가능)
-    comp_prices: 경쟁 후보들(타플랫폼 현재가, 유사 평균 등) 숫자 리스트
-    mode: "new"|"slow"|"drop"|"hot"|"" 
+    카탈로그 전체를 한 번에 계산하는 벡터 버전 (스타일 n개)
+    erp: (n,) ERP 가격 (NaN 이면 추천가도 NaN)
+    cur_price: (n,) 현재 우리 플랫폼가 (NaN/0 이하는 없음으로 취급)
+    comp_prices: (n, k) 경쟁 후보들(타플랫폼 현재가, 유사 평균 등), NaN/0 이하는 무시
+    mode: (n,) "new"|"slow"|"drop"|"hot"|""
     cfg: {"fee_rate","min_add","base_add","floor"}
+    tune: PRICE_TUNING 형식
+    cfg/tune 값에 (c, 1) 배열을 넣으면 설정 c개를 한 번에 계산해 (c, n) 을 반환 (시나리오 스윕)
     """
-    # 최소 기준
-    base_min  = max((erp or 0.0) * (1 + cfg["fee_rate"]) + cfg["min_add"], cfg["floor"])
-    base_norm = max((erp or 0.0) * (1 + cfg["fee_rate"]) + cfg["base_add"], cfg["floor"])
+    erp   = np.asarray(erp, dtype=float)
+    mode  = np.asarray(mode, dtype=object)
+    comps = np.asarray(comp_prices, dtype=float).reshape(len(erp), -1)
 
-    p_cur = None
-    try:
-        if cur_price is not None and not pd.isna(cur_price) and float(cur_price) > 0:
-            p_cur = float(cur_price)
-    except Exception:
-        p_cur = None
-
-    comps = []
-    for x in comp_prices:
-        try:
-            if x is not None and not pd.isna(x) and float(x) > 0:
-                comps.append(float(x))
-        except Exception:
-            continue
-
-    best_comp  = min(comps) if comps else None
-    worst_comp = max(comps) if comps else None
-
-    # 튜닝값
-    BEAT_BY_SLOW = 0.20     # 경쟁가보다 이만큼 싸게(슬로우/보통)
-    BEAT_BY_DROP = 0.50     # 급감은 더 크게
-    DISC_SLOW    = 0.03     # 현재가 대비 3% 인하(슬로우)
-    DISC_DROP    = 0.10     # 현재가 대비 10% 인하(급감)
-
-    UPLIFT_HOT_PCT  = 0.05  # 핫: 최소 5% 인상
-    UPLIFT_HOT_ABS  = 0.50  # 핫: 혹은 최소 +$0.5 인상
-    BEAT_UPWARDS    = 1.00  # 핫: 경쟁가를 +$1 넘겨서 적정가 앵커링
-
-    def _floor(x):
-        try:
-            z = float(x)
-        except Exception:
-            z = base_norm
-        return max(base_min, z)
-
-    # 각 모드별 후보 가격 산출(빈 리스트 방지)
-    cands = []
-
-    if mode in ["new", "slow"]:
-        if p_cur:     cands.append(p_cur * (1 - DISC_SLOW))
-        if best_comp: cands.append(best_comp - BEAT_BY_SLOW)
-        cands.append(base_norm)
-        # 하한 보정
-        cands = [_floor(c) for c in cands if c and c > 0]
-        if not cands:
-            return round(_floor(base_norm), 2)
-        rec = min(cands)
-        if p_cur and rec > p_cur:   # 절대 인상 금지
-            rec = p_cur
-
-    elif mode == "drop":
-        if p_cur:     cands.append(p_cur * (1 - DISC_DROP))
-        if best_comp: cands.append(best_comp - BEAT_BY_DROP)
-        cands.append(base_norm)
-        cands = [_floor(c) for c in cands if c and c > 0]
-        if not cands:
-            return round(_floor(base_norm), 2)
-        rec = min(cands)
-        if p_cur and rec > p_cur:
-            rec = p_cur
-
-    elif mode == "hot":
-        if p_cur:
-            cands.append(p_cur * (1 + UPLIFT_HOT_PCT))
-            cands.append(p_cur + UPLIFT_HOT_ABS)
-        if worst_comp:
-            cands.append(worst_comp + BEAT_UPWARDS)
-        cands.append(base_norm)
-        cands = [_floor(c) for c in cands if c and c > 0]
-        if not cands:
-            return round(_floor(base_norm if not p_cur else max(p_cur + UPLIFT_HOT_ABS, p_cur*(1+UPLIFT_HOT_PCT))), 2)
-        rec = max(cands)
-        if p_cur and rec < p_cur:  # 혹시라도 하향되면 강제 인상
-            rec = _floor(max(p_cur + UPLIFT_HOT_ABS, p_cur*(1+UPLIFT_HOT_PCT)))
-
-    else:
-        if p_cur:     cands.append(p_cur)
-        if best_comp: cands.append(best_comp - BEAT_BY_SLOW)
-        cands.append(base_norm)
-        cands = [_floor(c) for c in cands if c and c > 0]
-        if not cands:
-            return round(_floor(base_norm), 2)
-        rec = min(cands)
-        if p_cur and rec > p_cur:
-            rec = p_cur
-
-    return round(_floor(rec), 2)
+    # 최소 기준
+    base_min  = np.maximum(erp * (1 + cfg["fee_rate"]) + cfg["min_add"], cfg["floor"])
+    base_norm = np.maximum(erp * (1 + cfg["fee_rate"]) + cfg["base_add"], cfg["floor"])
+
+    cur = np.asarray(cur_price, dtype=float)
+    p_cur = np.where(cur > 0, cur, np.nan)
+    comps = np.where(comps > 0, comps, np.nan)
+    best_comp  = np.fmin.reduce(comps, axis=1)   # 후보 없으면 NaN
+    worst_comp = np.fmax.reduce(comps, axis=1)
+
+    def _cand(x):
+        # 0 이하/없는 후보는 제외(NaN), 나머지는 하한 보정
+        return np.where(x > 0, np.maximum(base_min, x), np.nan)
+
+    # 인하 계열(new/slow/drop/보통): 후보 최솟값, 현재가 초과 금지
+    is_drop = mode == "drop"
+    disc = np.select([is_drop, np.isin(mode, ["new", "slow"])], [tune["DISC_DROP"], tune["DISC_SLOW"]], 0.0)
+    beat = np.where(is_drop, tune["BEAT_BY_DROP"], tune["BEAT_BY_SLOW"])
+    down = reduce(np.fmin, [_cand(p_cur * (1 - disc)), _cand(best_comp - beat), _cand(base_norm)])
+    down = np.where(down > p_cur, p_cur, down)
+
+    # 핫: 후보 최댓값 (현재가 +5% / +$0.5 / 최고 경쟁가 +$1)
+    up = reduce(np.fmax, [_cand(p_cur * (1 + tune["UPLIFT_HOT_PCT"])), _cand(p_cur + tune["UPLIFT_HOT_ABS"]),
+                          _cand(worst_comp + tune["BEAT_UPWARDS"]), _cand(base_norm)])
+
+    rec = np.where(mode == "hot", up, down)
+    return np.round(np.maximum(base_min, rec), 2)
+
+# ===================== 모드 판정 (벡터) =====================
+MODE_RULES = [
+    ("new",  "최근 30일 판매 없음 (성숙 90일 경과)"),
+    ("slow", "최근 30일 판매 1~2건 (저조)"),
+    ("drop", "판매 급감 (직전 30일 대비 50%↓)"),
+    ("hot",  "판매 증가 (가격 인상 추천)"),
+]
+
+def classify_modes(qty30, qty30_prev):
+    qty30, qty30_prev = np.asarray(qty30, dtype=float), np.asarray(qty30_prev, dtype=float)
+    conds = [
+        qty30 == 0,
+        qty30 <= 2,
+        (qty30_prev > 0) & (qty30 <= 0.5 * qty30_prev),
+        (qty30 >= 10) & (qty30 > qty30_prev),
+    ]
+    mode = np.select(conds, [m for m, _ in MODE_RULES], "")
+    why  = np.select(conds, [w for _, w in MODE_RULES], "")
+    return mode, why
 
 # ===================== 유사 스타일 평균가(간단) =====================
-def similar_avg(style):
-    tem = df_temu[df_temu["product number"].astype(str) != str(style)]["base price total"]
-    sh  = df_shein[df_shein["product description"].astype(str) != str(style)]["product price"]
+def similar_avg(keys: pd.Series) -> np.ndarray:
+    """
+    스타일별: 해당 스타일을 뺀 TEMU 평균가와 SHEIN 평균가의 평균
+    (leave-one-out: 전체 합/건수에서 자기 몫만 차감 → 스타일당 O(1))
+    """
     pool = []
-    if tem.notna().mean() > 0:
-        pool.append(tem.mean())
-    if sh.notna().mean() > 0:
-        pool.append(sh.mean())
-    return float(np.nanmean(pool)) if pool else np.nan
+    for plat in ("TEMU", "SHEIN"):
+        stats, total_sum, total_cnt = PRICE_STATS[plat]
+        own = stats[["sum", "cnt"]].reindex(keys.to_numpy()).fillna(0.0)
+        cnt = total_cnt - own["cnt"].to_numpy()
+        with np.errstate(invalid="ignore", divide="ignore"):
+            pool.append(np.where(cnt > 0, (total_sum - own["sum"].to_numpy()) / cnt, np.nan))
+    pool = np.vstack(pool)
+    n = np.isfinite(pool).sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(n > 0, np.nansum(pool, axis=0) / n, np.nan)
+
+# ===================== 유사 스타일 (속성 kNN) =====================
+SIM_ATTR_COLS = ["sleeve", "neckline", "length", "fit", "detail", "style mood"]
+SIM_K = 5             # 이웃 수
+SIM_ERP_WEIGHT = 2.0  # ERP 가격(표준화) 가중치 — 속성 1개 일치와 비슷한 비중
+
+@st.cache_data(show_spinner=False)
+def style_neighbors(version: str) -> tuple:
+    """
+    PRODUCT_INFO 속성(멀티핫) + ERP 가격으로 BallTree 를 1회 구성하고
+    전 스타일의 k 최근접 이웃을 한 번에 조회 → (style_key 배열, 이웃 style_key 배열 (n, k))
+    """
+    keys = df_info.get("product number", pd.Series("", index=df_info.index)).astype(str).str.upper().str.replace(" ", "", regex=False)
+    mask = (keys != "") & ~keys.duplicated()
+    info, keys = df_info[mask], keys[mask].to_numpy()
+    if len(keys) < 2:
+        return keys, np.empty((len(keys), 0), dtype=object)
+
+    feats = []
+    for col in SIM_ATTR_COLS:
+        if col in info.columns:
+            vals = info[col].fillna("").astype(str).str.upper().str.replace(r"\s*,\s*", ",", regex=True).str.strip(", ")
+            feats.append(vals.str.get_dummies(sep=",").add_prefix(f"{col}="))
+    erp = info["erp price"].astype(float)
+    erp = erp.fillna(erp.median() if erp.notna().any() else 0.0)
+    std = erp.std()
+    feats.append(pd.DataFrame({"erp": (erp - erp.mean()) / std * SIM_ERP_WEIGHT if std > 0 else 0.0}, index=info.index))
+    X = pd.concat(feats, axis=1).to_numpy(dtype=float)
+
+    k = min(SIM_K, len(keys) - 1)
+    _, idx = BallTree(X).query(X, k=k + 1)
+    # 자기 자신 제외 (거리 0 동점으로 자기가 결과에 없으면 마지막 이웃을 제외)
+    own = idx == np.arange(len(keys))[:, None]
+    own[~own.any(axis=1), -1] = True
+    idx = idx[~own].reshape(len(keys), k)
+    return keys, keys[idx]
+
+def comparable_price(keys: pd.Series, platform: str) -> np.ndarray:
+    """속성 유사 스타일 k개의 현재가 평균 (이웃 가격이 없으면 leave-one-out 전체 평균으로 대체)"""
+    all_keys, nbrs = style_neighbors(data_version())
+    price = now_price(PRICE_STATS[platform][0])
+    nb = pd.DataFrame(nbrs, index=all_keys).reindex(keys.to_numpy())
+    nb_price = nb.apply(lambda c: c.map(price)).to_numpy(dtype=float) if nb.shape[1] else np.empty((len(keys), 0))
+    n = np.isfinite(nb_price).sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        anchor = np.where(n > 0, np.nansum(nb_price, axis=1) / n, np.nan)
+    return np.where(np.isfinite(anchor), anchor, similar_avg(keys))
 
 # ===================== 레코드 빌드 (성숙 90일 이후만) =====================
-def build_records_for_platform(platform: str):
+def platform_inputs(platform: str) -> dict:
+    """성숙 스타일 전체의 가격 계산 입력 배열 (스타일 n개 기준, 없으면 빈 dict)"""
     today = pd.Timestamp.today().normalize()
     live_col = "temu_live_date" if platform == "TEMU" else "shein_live_date"
-
-    records = []
-    for _, row in df_info.iterrows():
-        style = str(row.get("product number", "")).strip()
-        if not style:
-            continue
-
-        live_dt = row.get(live_col)
-        if pd.isna(live_dt):
-            # 해당 플랫폼에 등록 안된 상품은 스킵
-            continue
-
-        # 성숙 기준 적용
-        if (today - pd.to_datetime(live_dt)).days < MATURE_DAYS:
-            # 90일 미만은 분석 제외
-            continue
-
-        erp   = row.get("erp price", np.nan)
-        img   = img_dict.get(style, "")
-
-        # 최근/직전 30일 판매 수량 (플랫폼별)
-        if platform == "TEMU":
-            qty30      = get_qty(df_temu,  style, start_30, now_ts, "TEMU")
-            qty30_prev = get_qty(df_temu,  style, prev_30_start, prev_30_end, "TEMU")
-            cur_price  = temu_now_num(style)
-            comp_price = shein_now_num(style)  # 타플랫폼 평균가
-        else:
-            qty30      = get_qty(df_shein, style, start_30, now_ts, "SHEIN")
-            qty30_prev = get_qty(df_shein, style, prev_30_start, prev_30_end, "SHEIN")
-            cur_price  = shein_now_num(style)
-            comp_price = temu_now_num(style)
-
-        qty_all = qty30 + qty30_prev  # 총 판매(최근60일)
-
-        # 모드 판정
-        if qty30 == 0:
-            mode, why = "new", "최근 30일 판매 없음 (성숙 90일 경과)"
-        elif qty30 <= 2:
-            mode, why = "slow", "최근 30일 판매 1~2건 (저조)"
-        elif qty30_prev > 0 and qty30 <= 0.5 * qty30_prev:
-            mode, why = "drop", "판매 급감 (직전 30일 대비 50%↓)"
-        elif qty30 >= 10 and qty30 > qty30_prev:
-            mode, why = "hot", "판매 증가 (가격 인상 추천)"
-        else:
-            mode, why = "", ""
-
-        sim   = similar_avg(style)
-        rec   = suggest_price_platform(erp, cur_price, [comp_price, sim], mode, PLATFORM_CFG[platform])
-
-        rec_row = {
-            "이미지": make_img_tag(img),
-            "Style Number": style,
-            "ERP Price": show_price(erp),
-            f"{platform} 현재가": show_price(cur_price),
-            f"추천가_{platform}": show_price(rec),
-            "30일판매": int(qty30),
-            "이전30일": int(qty30_prev),
-            "최근60일": int(qty_all),
-            "사유": why,
-            "mode": mode
-        }
-        records.append(rec_row)
-
-    return pd.DataFrame(records)
-
-df_rec = build_records_for_platform(platform_view)
+    other = "SHEIN" if platform == "TEMU" else "TEMU"
+
+    # 해당 플랫폼 등록 + 성숙 90일 경과 상품만
+    info = df_info.assign(style=df_info.get("product number", pd.Series("", index=df_info.index)).astype(str).str.strip())
+    info = info[(info["style"] != "") & info[live_col].notna()]
+    info = info[(today - info[live_col]).dt.days >= MATURE_DAYS]
+    if info.empty:
+        return {}
+    keys = info["style"].str.upper().str.replace(" ", "", regex=False)
+
+    # 최근/직전 30일 판매 수량 (일별 큐브에서 두 구간을 groupby 1회로)
+    windows = {"cur": (start_30, now_ts), "prev": (prev_30_start, prev_30_end)}
+    stats = compare_periods(windows, daily_cube())
+    qty30      = period_stats(stats, "cur", platform)["qty"].reindex(keys.to_numpy()).fillna(0).to_numpy()
+    qty30_prev = period_stats(stats, "prev", platform)["qty"].reindex(keys.to_numpy()).fillna(0).to_numpy()
+
+    # 현재가(우리 플랫폼) / 타플랫폼 평균가
+    cur_price  = now_price(PRICE_STATS[platform][0]).reindex(keys.to_numpy()).to_numpy()
+    comp_price = now_price(PRICE_STATS[other][0]).reindex(keys.to_numpy()).to_numpy()
+
+    mode, why = classify_modes(qty30, qty30_prev)
+    sim = comparable_price(keys, platform)
+    return {
+        "style": info["style"].to_numpy(), "erp": info["erp price"].to_numpy(dtype=float),
+        "cur_price": cur_price, "comps": np.column_stack([comp_price, sim]), "sim": sim,
+        "qty30": qty30, "qty30_prev": qty30_prev, "mode": mode, "why": why,
+    }
+
+def build_records_for_platform(platform: str, inputs: dict):
+    if not inputs:
+        return pd.DataFrame()
+    style, erp, cur_price, sim = inputs["style"], inputs["erp"], inputs["cur_price"], inputs["sim"]
+    qty30, qty30_prev = inputs["qty30"], inputs["qty30_prev"]
+    rec = suggest_price_platform(erp, cur_price, inputs["comps"], inputs["mode"], PLATFORM_CFG[platform])
+
+    return pd.DataFrame({
+        "이미지": [make_img_tag(img_dict.get(sty, "")) for sty in style],
+        "Style Number": style,
+        "ERP Price": [show_price(x) for x in erp],
+        f"{platform} 현재가": [show_price(x) for x in cur_price],
+        "유사가": [show_price(x) for x in sim],
+        f"추천가_{platform}": [show_price(x) for x in rec],
+        "30일판매": qty30.astype(int),
+        "이전30일": qty30_prev.astype(int),
+        "최근60일": (qty30 + qty30_prev).astype(int),
+        "사유": inputs["why"],
+        "mode": inputs["mode"],
+    })
+
+INPUTS = platform_inputs(platform_view)
+df_rec = build_records_for_platform(platform_view, INPUTS)
 
 # ===================== 보기: 추천가 하이라이트 =====================
 def highlight_price(val):
@@ -351,7 +319,7 @@ def display_table(df, comment, platform_view):
         return
 
     cols = ["이미지", "Style Number", "ERP Price",
-            f"{platform_view} 현재가", f"추천가_{platform_view}",
+            f"{platform_view} 현재가", "유사가", f"추천가_{platform_view}",
             "30일판매", "이전30일", "최근60일", "사유"]
     show = df[cols].copy()
     styled = show.style.applymap(highlight_price, subset=[f"추천가_{platform_view}"])
@@ -371,6 +339,82 @@ with tabs[2]:
 with tabs[3]:
     display_table(df_rec[df_rec["mode"] == "hot"],  "판매 증가 핫아이템 (최소 5% 또는 $0.5 인상 + 경쟁가+α)", platform_view)
 
+# ===================== 시나리오 스윕 (설정 그리드 일괄 평가) =====================
+SWEEP_PARAMS = ["fee_rate", "base_add", "min_add", "floor"] + list(PRICE_TUNING)
+
+def price_action(rec, cur):
+    """현재가 대비 조치: -1 인하 / 0 유지 / 1 인상 (현재가나 추천가가 없으면 0)"""
+    with np.errstate(invalid="ignore"):
+        return np.where(np.isfinite(cur) & np.isfinite(rec), np.sign(np.round(rec - cur, 2)), 0)
+
+SWEEP_CHUNK_CELLS = 500_000  # 한 번에 계산할 (설정 × 스타일) 셀 수 — 중간 배열 하나 ≈ 4MB
+
+def sweep_configs(platform: str, inputs: dict, grid: dict) -> pd.DataFrame:
+    """
+    grid: 파라미터 → 후보값 리스트. 조합을 (c, 1) 배열로 만들어 suggest_price_platform 으로 (c, n) 계산
+    메모리 상한을 위해 조합은 SWEEP_CHUNK_CELLS 크기 묶음으로 나눠 평가하고 조합별 요약만 모음
+    매출/마진은 최근 30일 판매수량이 그대로 유지된다는 가정의 단순 추정
+    """
+    combos = pd.DataFrame(list(itertools.product(*grid.values())), columns=list(grid))
+    erp, cur, qty = inputs["erp"], inputs["cur_price"], inputs["qty30"]
+
+    def revenue_margin(price, fee):
+        return np.nansum(price * qty, axis=-1), np.nansum((price * (1 - fee) - erp) * qty, axis=-1)
+
+    base = suggest_price_platform(erp, cur, inputs["comps"], inputs["mode"], PLATFORM_CFG[platform])  # (n,)
+    base_rev, base_margin = revenue_margin(base, PLATFORM_CFG[platform]["fee_rate"])
+    base_act = price_action(base, cur)
+
+    chunk = max(1, SWEEP_CHUNK_CELLS // max(len(erp), 1))
+    parts = []
+    for i in range(0, len(combos), chunk):
+        col = {k: combos[k].to_numpy(dtype=float)[i:i + chunk, None] for k in combos}
+        cfg = {k: col[k] for k in ["fee_rate", "base_add", "min_add", "floor"]}
+        tune = {k: col[k] for k in PRICE_TUNING}
+        rec = suggest_price_platform(erp, cur, inputs["comps"], inputs["mode"], cfg, tune)   # (chunk, n)
+        rev, margin = revenue_margin(rec, cfg["fee_rate"])
+        act = price_action(rec, cur)
+        parts.append(pd.DataFrame({
+            "추천가 변경": (np.abs(rec - base) >= 0.01).sum(axis=1),
+            "조치 변경": (act != base_act).sum(axis=1),
+            "인하": (act < 0).sum(axis=1),
+            "인상": (act > 0).sum(axis=1),
+            "예상매출(30일)": rev.round(2),
+            "매출 Δ": (rev - base_rev).round(2),
+            "예상마진(30일)": margin.round(2),
+            "마진 Δ": (margin - base_margin).round(2),
+        }))
+    out = pd.concat([combos, pd.concat(parts, ignore_index=True)], axis=1)
+    return out.sort_values("마진 Δ", ascending=False, ignore_index=True)
+
+def parse_grid_values(text: str, default: float) -> list:
+    vals = []
+    for tok in str(text).split(","):
+        try:
+            vals.append(float(tok.strip()))
+        except ValueError:
+            continue
+    return sorted(set(vals)) or [default]
+
+with st.expander("🧪 시나리오 스윕 (PLATFORM_CFG / 튜닝값 그리드 비교)"):
+    if not INPUTS:
+        st.info("성숙 스타일이 없습니다.")
+    else:
+        current = {**PLATFORM_CFG[platform_view], **PRICE_TUNING}
+        st.caption("파라미터별 후보값을 쉼표로 입력하면 모든 조합을 성숙 스타일 전체에 한 번에 적용합니다. "
+                   "Δ 는 현재 설정 대비, 매출/마진은 최근 30일 판매수량 유지 가정.")
+        grid = {}
+        gcols = st.columns(4)
+        for i, k in enumerate(SWEEP_PARAMS):
+            with gcols[i % 4]:
+                grid[k] = parse_grid_values(st.text_input(k, value=f"{current[k]:g}", key=f"sweep_{k}"), current[k])
+        n_combo = int(np.prod([len(v) for v in grid.values()]))
+        st.write(f"조합 수: **{n_combo:,}** × 스타일 {len(INPUTS['style']):,}개")
+        if n_combo > 20000:
+            st.warning("조합 수가 너무 많습니다. 후보값을 줄여주세요. (최대 20,000)")
+        else:
+            st.dataframe(sweep_configs(platform_view, INPUTS, grid), hide_index=True, use_container_width=True)
+
 # ===================== 상단 요약(디버깅/확인용) =====================
 with st.expander("진단"):
     live_col = "temu_live_date" if platform_view == "TEMU" else "shein_live_date"
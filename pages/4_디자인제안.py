@@ -2,9 +2,8 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-from dateutil import parser
-from collections import Counter
 from urllib.parse import quote
+from sales_data import load_sales_data, order_facts, data_version, STATUS_SOLD
 
 # =========================
 # 기본 설정
@@ -15,36 +14,6 @@ st.title("🧠✨ AI 의류 디자인 제안")
 # =========================
 # 유틸
 # =========================
-def parse_temudate(dt):
-    try:
-        return parser.parse(str(dt).split('(')[0].strip(), fuzzy=True)
-    except Exception:
-        return pd.NaT
-
-def parse_sheindate(dt):
-    try:
-        return pd.to_datetime(str(dt), errors="coerce", infer_datetime_format=True)
-    except Exception:
-        return pd.NaT
-
-@st.cache_data(show_spinner=False)
-def load_google_sheet(sheet_name: str) -> pd.DataFrame:
-    import gspread
-    from oauth2client.service_account import ServiceAccountCredentials
-    import json
-    GOOGLE_SHEET_URL = "https://docs.google.com/spreadsheets/d/1oyVzCgGK1Q3Qi_sbYwE-wKG6SArnfUDRe7rQfGOF-Eo"
-    scope = ["https://spreadsheets.google.com/feeds",
-             "https://www.googleapis.com/auth/drive"]
-    creds_json = {k: str(v) for k, v in st.secrets["gcp_service_account"].items()}
-    with open("/tmp/service_account.json", "w") as f:
-        json.dump(creds_json, f)
-    creds = ServiceAccountCredentials.from_json_keyfile_name("/tmp/service_account.json", scope)
-    client = gspread.authorize(creds)
-    ws = client.open_by_url(GOOGLE_SHEET_URL).worksheet(sheet_name)
-    df = pd.DataFrame(ws.get_all_records())
-    df.columns = [c.lower().strip() for c in df.columns]
-    return df
-
 def _clean(x):
     s = str(x).strip()
     return s if s and s.lower() not in ["nan","none","-",""] else None
@@ -59,15 +28,11 @@ def season_sets(target: str):
 # =========================
 # 데이터 로드
 # =========================
-df_info  = load_google_sheet("PRODUCT_INFO")
-df_temu  = load_google_sheet("TEMU_SALES")
-df_shein = load_google_sheet("SHEIN_SALES")
+df_info, df_temu, df_shein = load_sales_data()
 
-df_temu["order date"]  = df_temu["purchase date"].apply(parse_temudate)
-df_shein["order date"] = df_shein["order processed on"].apply(parse_sheindate)
-
-IMG_MAP = dict(zip(df_info.get("product number", pd.Series(dtype=str)).astype(str),
-                   df_info.get("image","")))
+# style_key(대문자·공백 제거 상품번호) 기준
+INFO_KEYS = df_info.get("product number", pd.Series("", index=df_info.index)).astype(str).str.upper().str.replace(" ", "", regex=False)
+IMG_MAP = dict(zip(INFO_KEYS, df_info.get("image","")))
 
 # 우리가 갖고있는 속성
 ATTR_COLS = ["neckline", "length", "fit", "detail", "style mood"]
@@ -111,74 +76,67 @@ goal = st.sidebar.selectbox(
 # =========================
 # 가중치 계산 (전체 데이터 + 시즌 치중)
 # =========================
-target_months, adjacent_months = season_sets(season)
+def sales_weights(dates: pd.Series, season: str, year: int, asof: pd.Period) -> np.ndarray:
+    """주문일 배열 → 가중치 (시즌 × 직전 타깃 시즌 부스트 × 최근성), 날짜 없으면 0"""
+    target_months, adjacent_months = season_sets(season)
+    m = dates.dt.month.to_numpy()
+    y = dates.dt.year.to_numpy()
+    in_target = np.isin(m, list(target_months))
+    w_season = np.select([in_target, np.isin(m, list(adjacent_months))], [1.0, 0.7], 0.4)
+    # 직전 타깃 시즌(연도 고려) 부스트
+    prev = (y == year - 1)
+    if season == "Winter":
+        prev |= ((y == year) & np.isin(m, [1, 2])) | ((y == year - 1) & (m == 12))
+    boost = np.where(in_target & prev, 1.3, 1.0)
+    # 최근성 보정 (기준 월로부터 18개월 이내 1.0)
+    rec = (asof.year - y) * 12 + (asof.month - m)
+    w_recency = np.where(rec <= 18, 1.0, 0.7)
+    return np.where(dates.notna().to_numpy(), w_season * boost * w_recency, 0.0)
 
-def months_ago(ts: pd.Timestamp) -> int:
-    today = pd.Timestamp.today()
-    return max(0, (today.year - ts.year) * 12 + (today.month - ts.month)) if pd.notna(ts) else 999
+@st.cache_data(show_spinner=False)
+def weighted_sales(version: str, platform: str, season: str, year: int, asof: pd.Period) -> pd.DataFrame:
+    """style_key 별 가중 판매수량 (내림차순). 사이드바의 topN/프롬프트 수와 무관하게 재사용"""
+    # 통합 주문 팩트: qty 는 TEMU shipped 수량 / SHEIN 건당 1, BOTH 는 플랫폼 필터 없음
+    f = order_facts()
+    f = f[f["status_code"] == STATUS_SOLD]
+    if platform != "BOTH":
+        f = f[f["platform"] == platform]
+    w = pd.DataFrame({"style": f["style_key"], "wqty": f["qty"].to_numpy() * sales_weights(f["order date"], season, year, asof)})
+    return (w.groupby("style", as_index=False)["wqty"].sum()
+             .sort_values("wqty", ascending=False, kind="stable", ignore_index=True))
 
-def row_weight(order_dt: pd.Timestamp) -> float:
-    if pd.isna(order_dt): return 0.0
-    m = int(order_dt.month)
-    y = int(order_dt.year)
-    w_season = 1.0 if m in target_months else (0.7 if m in adjacent_months else 0.4)
-    # 직전 타깃 시즌(연도 고려) 부스트
-    prev_year_boost = 1.0
-    if m in target_months and (y == year-1 or (season=="Winter" and ((y==year and m in [1,2]) or (y==year-1 and m==12)))):
-        prev_year_boost = 1.3
-    # 최근성 보정
-    rec = months_ago(order_dt)
-    w_recency = 1.0 if rec <= 18 else 0.7
-    return w_season * prev_year_boost * w_recency
-
-def build_weighted_sales():
-    frames=[]
-    if platform in ["TEMU","BOTH"]:
-        t = df_temu.copy()
-        t = t[t["order item status"].astype(str).str.lower().isin(["shipped","delivered"])]
-        t["qty"] = pd.to_numeric(t["quantity shipped"], errors="coerce").fillna(0)
-        t["w"] = t["order date"].apply(row_weight)
-        t["wqty"] = t["qty"] * t["w"]
-        t = t.groupby("product number", as_index=False)["wqty"].sum().rename(columns={"product number":"style"})
-        frames.append(t)
-    if platform in ["SHEIN","BOTH"]:
-        s = df_shein.copy()
-        s = s[~s["order status"].astype(str).str.lower().isin(["customer refunded"])]
-        s["qty"] = 1.0
-        s["w"] = s["order date"].apply(row_weight)
-        s["wqty"] = s["qty"] * s["w"]
-        s = s.groupby("product description", as_index=False)["wqty"].sum().rename(columns={"product description":"style"})
-        frames.append(s)
-    if not frames:
-        return pd.DataFrame(columns=["style","wqty"])
-    return pd.concat(frames, ignore_index=True)
-
-w_sales = build_weighted_sales()
+@st.cache_data(show_spinner=False)
+def style_attrs(version: str, platform: str, season: str, year: int, asof: pd.Period) -> pd.DataFrame:
+    """(rank, attr, value, wqty) 롱 테이블. rank 는 weighted_sales 순위 → topN 변경은 rank 필터만"""
+    ws = weighted_sales(version, platform, season, year, asof)
+    ws = ws[ws["wqty"] > 0]
+    rank = pd.Series(np.arange(len(ws)), index=ws["style"].to_numpy())
+    info = df_info[ATTR_COLS].assign(rank=INFO_KEYS.map(rank)).dropna(subset=["rank"]).astype({"rank": int})
+    long = info.melt(id_vars="rank", var_name="attr", value_name="value")
+    long["value"] = long["value"].astype(str).str.strip()
+    long = long[~long["value"].str.lower().isin(["nan","none","-",""])]
+    long["wqty"] = ws["wqty"].to_numpy()[long["rank"].to_numpy()]
+    return long
+
+asof = pd.Timestamp.today().to_period("M")
+w_sales = weighted_sales(data_version(), platform, season, int(year), asof)
 if w_sales.empty:
     st.info("데이터가 없습니다. 시트를 확인하세요.")
     st.stop()
 
-top_styles = w_sales.sort_values("wqty", ascending=False).head(topN)["style"].astype(str).tolist()
-
-info = df_info.copy()
-info.rename(columns={"product number":"style"}, inplace=True)
-info["style"] = info["style"].astype(str)
-top_df = info[info["style"].isin(top_styles)].copy()
-
-style_w = dict(zip(w_sales["style"].astype(str), w_sales["wqty"]))
-
 # =========================
-# 속성 집계 (가중 카운트)
+# 속성 집계 (가중 카운트, 상위 topN 스타일)
 # =========================
-attr_counts = {c: Counter() for c in ATTR_COLS}
-for _, r in top_df.iterrows():
-    sw = style_w.get(str(r["style"]), 0.0)
-    for c in ATTR_COLS:
-        v = _clean(r.get(c))
-        if v and sw>0:
-            attr_counts[c][v] += sw
+top_attrs = style_attrs(data_version(), platform, season, int(year), asof)
+top_attrs = top_attrs[top_attrs["rank"] < topN]
+weights = top_attrs.groupby(["attr", "value"])["wqty"].sum()
+attr_counts = {
+    c: (weights.xs(c, level="attr").sort_values(ascending=False, kind="stable")
+        if c in weights.index.get_level_values("attr") else pd.Series(dtype=float))
+    for c in ATTR_COLS
+}
 
-dominant = {c: (attr_counts[c].most_common(1)[0][0] if attr_counts[c] else "-") for c in ATTR_COLS}
+dominant = {c: (attr_counts[c].index[0] if len(attr_counts[c]) else "-") for c in ATTR_COLS}
 
 # =========================
 # 시즌 보정(라이트)
@@ -206,8 +164,8 @@ def forecast_trends(year:int, season:str, attr_counts:dict) -> list[str]:
     bullets = []
     top_attr_lines = []
     for col in ["fit","length","neckline","detail","style mood"]:
-        if attr_counts.get(col) and len(attr_counts[col])>0:
-            v, amt = attr_counts[col].most_common(1)[0]
+        if col in attr_counts and len(attr_counts[col])>0:
+            v = attr_counts[col].index[0]
             top_attr_lines.append(f"{col}: `{v}` 상향")
     if top_attr_lines:
         bullets.append(f"{year} {season} 예측(내부 데이터 가중): " + "; ".join(top_attr_lines[:3]))
@@ -241,7 +199,7 @@ trend_bullets = forecast_trends(year, season, attr_counts)
 # 레퍼런스 이미지
 # =========================
 ref_urls = []
-top_styles_sorted = w_sales.sort_values("wqty", ascending=False)["style"].astype(str)
+top_styles_sorted = w_sales["style"].astype(str)
 for sid in top_styles_sorted.head(6):
     u = IMG_MAP.get(sid, "")
     if isinstance(u, str) and u.startswith("http"):
@@ -4,8 +4,8 @@
 # ==========================================
 import streamlit as st
 import pandas as pd
-import re
-from dateutil import parser
+import numpy as np
+from sales_data import load_sales_data, daily_cube, slice_dates
 
 # -------------------------
 # Page Config & Title
@@ -16,93 +16,34 @@ st.title("🔁 교차 플랫폼 성과 비교 (TEMU vs SHEIN)")
 # -------------------------
 # Helpers
 # -------------------------
-@st.cache_data(show_spinner=False)
-def load_google_sheet(sheet_name: str) -> pd.DataFrame:
-    import gspread
-    from oauth2client.service_account import ServiceAccountCredentials
-    import json
-    GOOGLE_SHEET_URL = "https://docs.google.com/spreadsheets/d/1oyVzCgGK1Q3Qi_sbYwE-wKG6SArnfUDRe7rQfGOF-Eo"
-    scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-    creds_json = {k: str(v) for k, v in st.secrets["gcp_service_account"].items()}
-    with open("/tmp/service_account.json", "w") as f:
-        import json as _json
-        _json.dump(creds_json, f)
-    creds = ServiceAccountCredentials.from_json_keyfile_name("/tmp/service_account.json", scope)
-    client = gspread.authorize(creds)
-    ws = client.open_by_url(GOOGLE_SHEET_URL).worksheet(sheet_name)
-    df = pd.DataFrame(ws.get_all_records())
-    df.columns = [c.lower().strip() for c in df.columns]
-    return df
-
-STYLE_RE = re.compile(r"\b([A-Z]{1,3}\d{3,5}[A-Z0-9]?)\b")
-
-def parse_temudate(x):
-    s = str(x)
-    if "(" in s:
-        s = s.split("(")[0].strip()
-    try:
-        return parser.parse(s, fuzzy=True)
-    except Exception:
-        return pd.NaT
-
-def parse_sheindate(x):
-    try:
-        return pd.to_datetime(str(x), errors="coerce", infer_datetime_format=True)
-    except Exception:
-        return pd.NaT
-
-def build_img_map(df_info: pd.DataFrame):
+def build_style_table(df_info: pd.DataFrame) -> pd.DataFrame:
+    """style_key → 이미지 / 등록여부 (temu_live_date / shein_live_date 존재). 중복 키는 마지막 행"""
     keys = df_info.get("product number", pd.Series(dtype=str)).astype(str).str.upper().str.replace(" ", "", regex=False)
-    return dict(zip(keys, df_info.get("image", "")))
+    none = pd.Series(None, index=df_info.index, dtype=object)
+    table = pd.DataFrame({
+        "image_url": df_info.get("image", none).fillna("").to_numpy(),
+        "등록_TEMU":  pd.to_datetime(df_info.get("temu_live_date", none),  errors="coerce").notna().to_numpy(),
+        "등록_SHEIN": pd.to_datetime(df_info.get("shein_live_date", none), errors="coerce").notna().to_numpy(),
+    }, index=keys.to_numpy())
+    return table[~table.index.duplicated(keep="last")]
 
-def style_key_from_label(label: str, img_map: dict) -> str | None:
-    s = str(label).strip().upper()
-    if not s:
-        return None
-    s_key = s.replace(" ", "")
-    if s_key in img_map:
-        return s_key
-    m = STYLE_RE.search(s)
-    if m:
-        cand = m.group(1).replace(" ", "")
-        if cand in img_map:
-            return cand
-    for k in img_map.keys():
-        if k in s_key:
-            return k
-    return None
 
 # -------------------------
 # Load & Normalize
 # -------------------------
-df_info  = load_google_sheet("PRODUCT_INFO")
-df_temu  = load_google_sheet("TEMU_SALES")
-df_shein = load_google_sheet("SHEIN_SALES")
-
-IMG_MAP = build_img_map(df_info)
+df_info, df_temu, df_shein = load_sales_data()
+CUBE = daily_cube()
 
-# 등록여부 맵 (temu_live_date / shein_live_date)
-info_key = df_info.get("product number", pd.Series(dtype=str)).astype(str).str.upper().str.replace(" ", "", regex=False)
-temu_live_map  = dict(zip(info_key, pd.to_datetime(df_info.get("temu_live_date"),  errors="coerce").notna()))
-shein_live_map = dict(zip(info_key, pd.to_datetime(df_info.get("shein_live_date"), errors="coerce").notna()))
+STYLE_TABLE = build_style_table(df_info)
 
-# Dates
-df_temu["order date"]  = df_temu["purchase date"].apply(parse_temudate)
-df_shein["order date"] = df_shein["order processed on"].apply(parse_sheindate)
-
-# Status & numeric 정규화
-df_temu["order item status"] = df_temu["order item status"].astype(str)
-df_temu["quantity shipped"] = pd.to_numeric(df_temu.get("quantity shipped", 0), errors="coerce").fillna(0)
-
-_money = lambda s: pd.to_numeric(s.astype(str).str.replace(r"[^0-9.\-]", "", regex=True), errors="coerce").fillna(0.0)
-df_shein["order status"]  = df_shein["order status"].astype(str)
-df_shein["product price"] = _money(df_shein["product price"])
+# 날짜/상태/금액 정규화와 일별 집계는 sales_data 에서 1회 수행
 
 # -------------------------
 # Date controls
 # -------------------------
-min_dt = pd.to_datetime(pd.concat([df_temu["order date"], df_shein["order date"]]).dropna()).min()
-max_dt = pd.to_datetime(pd.concat([df_temu["order date"], df_shein["order date"]]).dropna()).max()
+# 큐브는 날짜순 (날짜 없는 행은 제외돼 있음)
+min_dt = CUBE["order date"].iloc[0] if len(CUBE) else pd.NaT
+max_dt = CUBE["order date"].iloc[-1] if len(CUBE) else pd.NaT
 
 if pd.isna(min_dt) or pd.isna(max_dt):
     st.info("날짜 데이터가 없습니다. 시트를 확인하세요.")
@@ -124,72 +65,55 @@ end   = pd.to_datetime(end) + pd.Timedelta(days=1) - pd.Timedelta(seconds=1)
 # -------------------------
 # Aggregate per platform
 # -------------------------
-# TEMU: shipped/delivered only
-_t = df_temu[(df_temu["order date"] >= start) & (df_temu["order date"] <= end)].copy()
-_t = _t[_t["order item status"].str.lower().isin(["shipped", "delivered"])].copy()
-_t["style_key"] = _t["product number"].astype(str).apply(lambda x: style_key_from_label(x, IMG_MAP))
-_t = _t.dropna(subset=["style_key"])
+# 큐브의 판매분만 (TEMU: shipped/delivered, SHEIN: 환불 제외)
+_c = slice_dates(CUBE, start, end)
+_c = _c[_c["sold_cnt"] > 0].dropna(subset=["style_key"])
 
-temu_grp = _t.groupby("style_key").agg(
-    temu_qty=("quantity shipped", "sum"),
-    temu_sales=("base price total", lambda s: _money(s).sum()),
-)
-temu_grp["temu_qty"] = temu_grp["temu_qty"].round().astype(int)
-temu_grp["temu_aov"] = temu_grp.apply(lambda r: (r["temu_sales"] / r["temu_qty"]) if r["temu_qty"] > 0 else 0.0, axis=1)
+# 스타일 × 플랫폼 groupby 1회 → 플랫폼별 컬럼으로 펼침
+agg = _c.groupby(["style_key", "platform"])[["qty", "sales"]].sum().unstack("platform", fill_value=0.0)
+agg = agg.reindex(columns=pd.MultiIndex.from_product([["qty", "sales"], ["TEMU", "SHEIN"]]), fill_value=0.0)
 
-# SHEIN: exclude refunded
-_s = df_shein[(df_shein["order date"] >= start) & (df_shein["order date"] <= end)].copy()
-_s = _s[~_s["order status"].str.lower().isin(["customer refunded"])].copy()
-_s["style_key"] = _s["product description"].astype(str).apply(lambda x: style_key_from_label(x, IMG_MAP))
-_s = _s.dropna(subset=["style_key"]).copy()
+combined = pd.DataFrame({"Style Number": agg.index.to_numpy()})
+for plat in ("TEMU", "SHEIN"):
+    p = plat.lower()
+    qty = agg[("qty", plat)].to_numpy()
+    sales = agg[("sales", plat)].to_numpy()
+    combined[f"{p}_qty"] = np.round(qty).astype(int)
+    combined[f"{p}_sales"] = sales
+    combined[f"{p}_aov"] = np.divide(sales, combined[f"{p}_qty"], out=np.zeros_like(sales), where=combined[f"{p}_qty"].to_numpy() > 0)
 
-shein_grp = _s.groupby("style_key").agg(
-    shein_qty=("product description", "count"),
-    shein_sales=("product price", "sum"),
-)
-shein_grp["shein_qty"] = shein_grp["shein_qty"].round().astype(int)
-shein_grp["shein_aov"] = shein_grp.apply(lambda r: (r["shein_sales"] / r["shein_qty"]) if r["shein_qty"] > 0 else 0.0, axis=1)
-
-# -------------------------
-# Merge & Tags
-# -------------------------
-combined = pd.concat([temu_grp, shein_grp], axis=1).fillna(0.0).reset_index().rename(
-    columns={"index": "style_key", "style_key": "Style Number"}
-)
-
-# 등록여부 붙이기
-combined["등록_TEMU"]  = combined["Style Number"].apply(lambda x: bool(temu_live_map.get(str(x).upper(), False)))
-combined["등록_SHEIN"] = combined["Style Number"].apply(lambda x: bool(shein_live_map.get(str(x).upper(), False)))
+# 등록여부 붙이기 (style_key 테이블 조인)
+combined = combined.join(STYLE_TABLE[["등록_TEMU", "등록_SHEIN"]], on="Style Number")
+combined[["등록_TEMU", "등록_SHEIN"]] = combined[["등록_TEMU", "등록_SHEIN"]].fillna(False).astype(bool)
 
 STR_Q = 1.3  # 30% 이상 우위면 강세
 
-def tag_strength(r):
-    if r["temu_qty"] >= r["shein_qty"] * STR_Q and r["temu_qty"] >= 3:
-        return "TEMU 강세"
-    if r["shein_qty"] >= r["temu_qty"] * STR_Q and r["shein_qty"] >= 3:
-        return "SHEIN 강세"
-    return "균형"
-
-combined["태그"] = combined.apply(tag_strength, axis=1)
+tq, sq = combined["temu_qty"].to_numpy(), combined["shein_qty"].to_numpy()
+combined["태그"] = np.select(
+    [(tq >= sq * STR_Q) & (tq >= 3), (sq >= tq * STR_Q) & (sq >= 3)],
+    ["TEMU 강세", "SHEIN 강세"],
+    "균형",
+)
 
 # -------------------------
 # 액션 (등록여부 반영)
 # -------------------------
-def action_hint(row):
-    # 미등록 + 상대 플랫폼 판매/강세 → 등록 필요 우선
-    if not row["등록_TEMU"] and row["shein_qty"] > 0:
-        return "TEMU 등록 필요 (SHEIN 강세/판매, TEMU 미등록)"
-    if not row["등록_SHEIN"] and row["temu_qty"] > 0:
-        return "SHEIN 등록 필요 (TEMU 강세/판매, SHEIN 미등록)"
-
-    # 양 플랫폼 모두 등록된 상태에서의 권고
-    if row["태그"] == "TEMU 강세":
-        return "SHEIN 노출/가격 점검 (이미지·타이틀 개선 + 소폭 할인 검토)"
-    if row["태그"] == "SHEIN 강세":
-        return "TEMU 가격 재검토 또는 노출 강화 (키워드/이미지 개선)"
-    return "두 플랫폼 동일 전략 유지"
-
-combined["액션"] = combined.apply(action_hint, axis=1)
+# 미등록 + 상대 플랫폼 판매/강세 → 등록 필요 우선, 그다음 양 플랫폼 등록 상태에서의 권고
+combined["액션"] = np.select(
+    [
+        ~combined["등록_TEMU"] & (sq > 0),
+        ~combined["등록_SHEIN"] & (tq > 0),
+        combined["태그"] == "TEMU 강세",
+        combined["태그"] == "SHEIN 강세",
+    ],
+    [
+        "TEMU 등록 필요 (SHEIN 강세/판매, TEMU 미등록)",
+        "SHEIN 등록 필요 (TEMU 강세/판매, SHEIN 미등록)",
+        "SHEIN 노출/가격 점검 (이미지·타이틀 개선 + 소폭 할인 검토)",
+        "TEMU 가격 재검토 또는 노출 강화 (키워드/이미지 개선)",
+    ],
+    "두 플랫폼 동일 전략 유지",
+)
 
 # -------------------------
 # KPI Summary
@@ -236,7 +160,7 @@ st.markdown(f"""
 </style>
 """, unsafe_allow_html=True)
 
-combined["image_url"] = combined["Style Number"].apply(lambda x: IMG_MAP.get(str(x).upper(), ""))
+combined["image_url"] = STYLE_TABLE["image_url"].reindex(combined["Style Number"]).fillna("").to_numpy()
 
 show = combined[[
     "image_url", "Style Number",
@@ -4,9 +4,9 @@
 # ==========================================
 import streamlit as st
 import pandas as pd
+import numpy as np
 import altair as alt
-import re
-from dateutil import parser
+from sales_data import load_sales_data, order_facts, daily_cube, data_version, slice_dates
 
 st.set_page_config(page_title="옵션 · 카테고리 분석", layout="wide")
 st.title("🧩 옵션 · 카테고리 분석")
@@ -14,112 +14,46 @@ st.title("🧩 옵션 · 카테고리 분석")
 # -------------------------
 # Helpers
 # -------------------------
-@st.cache_data(show_spinner=False)
-def load_google_sheet(sheet_name: str) -> pd.DataFrame:
-    import gspread
-    from oauth2client.service_account import ServiceAccountCredentials
-    import json
-    GOOGLE_SHEET_URL = "https://docs.google.com/spreadsheets/d/1oyVzCgGK1Q3Qi_sbYwE-wKG6SArnfUDRe7rQfGOF-Eo"
-    scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-    creds_json = {k: str(v) for k, v in st.secrets["gcp_service_account"].items()}
-    with open("/tmp/service_account.json","w") as f:
-        import json as _json
-        _json.dump(creds_json, f)
-    creds = ServiceAccountCredentials.from_json_keyfile_name("/tmp/service_account.json", scope)
-    client = gspread.authorize(creds)
-    ws = client.open_by_url(GOOGLE_SHEET_URL).worksheet(sheet_name)
-    df = pd.DataFrame(ws.get_all_records())
-    df.columns = [c.lower().strip() for c in df.columns]
-    return df
-
-def parse_temudate(x):
-    s = str(x)
-    if "(" in s:
-        s = s.split("(")[0].strip()
-    try:
-        return parser.parse(s, fuzzy=True)
-    except Exception:
-        return pd.NaT
-
-def parse_sheindate(x):
-    try:
-        return pd.to_datetime(str(x), errors="coerce", infer_datetime_format=True)
-    except Exception:
-        return pd.NaT
-
-STYLE_RE = re.compile(r"\b([A-Z]{1,3}\d{3,5}[A-Z0-9]?)\b")
-
-def style_key_from_label(label: str) -> str | None:
-    s = str(label).strip().upper()
-    if not s:
-        return None
-    s_key = s.replace(" ", "")
-    m = STYLE_RE.search(s)
-    if m:
-        return m.group(1).replace(" ", "")
-    return None
-
-# 색상/사이즈 정규화
-def norm_color(s: str) -> str:
-    t = str(s).strip().replace("_", " ").upper()
-    return t
-
-SIZE_MAP = {
-    "SMALL":"S","MEDIUM":"M","LARGE":"L",
-    "1XL":"1X","2XL":"2X","3XL":"3X",
-    "XS":"XS","S":"S","M":"M","L":"L","XL":"XL","XXL":"2X","XXXL":"3X"
-}
-def norm_size(s: str) -> str:
-    t = str(s).strip().upper().replace(" ", "")
-    return SIZE_MAP.get(t, t)
-
 # LENGTH → 카테고리 매핑
 TOPS   = {"CROP TOP","WAIST TOP","LONG TOP"}
 DRESS  = {"MINI DRESS","MIDI DRESS","MAXI DRESS"}
 SKIRT  = {"MINI SKIRT","MIDI SKIRT","MAXI SKIRT"}
 PANTS  = {"SHORTS","KNEE","CAPRI","FULL"}  # 팬츠 길이 표현
 
-def map_length_to_cat(length: str) -> str | None:
-    vals = [v.strip().upper() for v in str(length).split(",") if v.strip()]
-    if not vals:
-        return None
-    cats = set()
-    for v in vals:
-        if v in TOPS: cats.add("TOP")
-        elif v in DRESS: cats.add("DRESS")
-        elif v in SKIRT: cats.add("SKIRT")
-        elif v in PANTS: cats.add("PANTS")
-    if len(cats) >= 2:
-        return "SET"
-    if cats:
-        return list(cats)[0]
-    return None
+LENGTH_CAT = {**dict.fromkeys(TOPS, "TOP"), **dict.fromkeys(DRESS, "DRESS"),
+              **dict.fromkeys(SKIRT, "SKIRT"), **dict.fromkeys(PANTS, "PANTS")}
+
+def map_length_to_cat(length: pd.Series) -> pd.Series:
+    """LENGTH(쉼표로 복수 가능) → 카테고리. 2종 이상이면 SET, 매칭 없으면 None"""
+    cats = (length.fillna("").astype(str).str.split(",").explode()
+            .str.strip().str.upper().map(LENGTH_CAT).dropna())
+    by_row = cats.groupby(level=0)
+    out = by_row.first().where(by_row.nunique() < 2, "SET")
+    return out.reindex(length.index).astype(object).where(lambda x: x.notna(), None)
 
 # -------------------------
 # Load
 # -------------------------
-info  = load_google_sheet("PRODUCT_INFO")
-temu  = load_google_sheet("TEMU_SALES")
-shein = load_google_sheet("SHEIN_SALES")
+# 공통 정규화/style_key 는 sales_data 에서 1회 수행
+info, temu, shein = load_sales_data()
 
-# 공통 정규화
-temu["order date"]  = temu["purchase date"].apply(parse_temudate)
-shein["order date"] = shein["order processed on"].apply(parse_sheindate)
-
-temu["order item status"] = temu["order item status"].astype(str)
-temu["quantity shipped"]  = pd.to_numeric(temu.get("quantity shipped", 0), errors="coerce").fillna(0)
-
-shein["order status"] = shein["order status"].astype(str)
-
-# product number → length map
+# style_key → LENGTH 기반 카테고리 (PRODUCT_INFO, 중복 키는 마지막 행)
 info_keys = info.get("product number", pd.Series(dtype=str)).astype(str).str.upper().str.replace(" ","", regex=False)
-length_map = dict(zip(info_keys, info.get("length","")))
+length_cat = pd.Series(
+    map_length_to_cat(info.get("length", pd.Series("", index=info.index)).reset_index(drop=True)).to_numpy(),
+    index=info_keys.to_numpy(), dtype=object,
+)
+length_cat = length_cat[~length_cat.index.duplicated(keep="last")]
 
 # -------------------------
 # Controls
 # -------------------------
-min_dt = pd.to_datetime(pd.concat([temu["order date"], shein["order date"]]).dropna()).min()
-max_dt = pd.to_datetime(pd.concat([temu["order date"], shein["order date"]]).dropna()).max()
+CUBE = daily_cube()
+# 큐브는 날짜순 (날짜 없는 행은 제외돼 있음)
+if CUBE.empty:
+    st.info("날짜 데이터가 없습니다. 시트를 확인하세요.")
+    st.stop()
+min_dt, max_dt = CUBE["order date"].iloc[0], CUBE["order date"].iloc[-1]
 
 a,b = st.columns([1.3,1])
 with a:
@@ -138,58 +72,34 @@ with b:
     platform = st.radio("플랫폼", ["BOTH","TEMU","SHEIN"], horizontal=True)
 
 # -------------------------
-# Build dataset (qty 기반)
+# Build dataset (qty 기반, 일별 큐브)
 # -------------------------
-rows = []
-
-# TEMU
-if platform in ["BOTH","TEMU"]:
-    t = temu[(temu["order date"]>=start)&(temu["order date"]<=end)].copy()
-    t = t[t["order item status"].str.lower().isin(["shipped","delivered"])]
-    for _,r in t.iterrows():
-        qty = float(r.get("quantity shipped",0))
-        if qty<=0: 
-            continue
-        # 카테고리: 우선 텍스트(ROMPER/JUMPSUIT) → 없으면 PRODUCT_INFO length
-        pn  = str(r.get("product number","")).upper().replace(" ","")
-        txt = str(r.get("product name by customer order","")).upper()
-        if "ROMPER" in txt:
-            cat = "ROMPER"
-        elif "JUMPSUIT" in txt:
-            cat = "JUMPSUIT"
-        else:
-            cat = map_length_to_cat(length_map.get(pn, ""))
-            if not cat: 
-                continue
-        rows.append({"platform":"TEMU","cat":cat,"qty":qty,
-                     "color":norm_color(r.get("color","")),
-                     "size":norm_size(r.get("size",""))})
-
-# SHEIN
-if platform in ["BOTH","SHEIN"]:
-    s = shein[(shein["order date"]>=start)&(shein["order date"]<=end)].copy()
-    s = s[~s["order status"].str.lower().eq("customer refunded")]
-    for _,r in s.iterrows():
-        qty = 1.0
-        desc = str(r.get("product description",""))
-        up   = desc.upper()
-        if "ROMPER" in up:
-            cat = "ROMPER"
-        elif "JUMPSUIT" in up:
-            cat = "JUMPSUIT"
-        else:
-            sk = style_key_from_label(desc)
-            cat = map_length_to_cat(length_map.get((sk or ""), ""))
-            if not cat:
-                continue
-        # 색상/사이즈: SELLER SKU = SKU-COLOR-SIZE
-        seller = str(r.get("seller sku",""))
-        parts  = seller.split("-")
-        cval   = norm_color(parts[-2]) if len(parts)>=3 else ""
-        sval   = norm_size(parts[-1])  if len(parts)>=2 else ""
-        rows.append({"platform":"SHEIN","cat":cat,"qty":qty,"color":cval,"size":sval})
-
-df = pd.DataFrame(rows)
+@st.cache_data(show_spinner=False)
+def style_categories(version: str) -> pd.Series:
+    """style_key → 카테고리 차원 테이블. 상품명에 ROMPER/JUMPSUIT 가 있으면 우선, 없으면 PRODUCT_INFO length"""
+    texts = order_facts()[["style_key", "title"]].rename(columns={"title": "txt"}).dropna(subset=["style_key"])
+    up = texts["txt"].astype(str).str.upper()
+    flags = pd.DataFrame({
+        "romper": up.str.contains("ROMPER", regex=False),
+        "jumpsuit": up.str.contains("JUMPSUIT", regex=False),
+    }).groupby(texts["style_key"]).any()
+    keys = flags.index.union(length_cat.index)
+    flags = flags.reindex(keys, fill_value=False)
+    cats = np.select([flags["romper"], flags["jumpsuit"]], ["ROMPER", "JUMPSUIT"], "")
+    return pd.Series(np.where(cats != "", cats, length_cat.reindex(keys).to_numpy()), index=keys, dtype=object)
+
+cube = slice_dates(CUBE, start, end)
+cube = cube[(cube["sold_cnt"] > 0) & (cube["qty"] > 0)].dropna(subset=["style_key"])
+if platform != "BOTH":
+    cube = cube[cube["platform"] == platform]
+
+df = pd.DataFrame({
+    "platform": cube["platform"],
+    "cat": cube["style_key"].map(style_categories(data_version())),
+    "qty": cube["qty"],
+    "color": cube["color"],   # 큐브에서 이미 정규화 (SIZE_MAP 포함)
+    "size": cube["size"],
+}).dropna(subset=["cat"])
 if df.empty:
     st.info("표시할 데이터가 없습니다.")
     st.stop()
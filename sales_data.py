@@ -0,0 +1,827 @@
+# sales_data.py
+# 공용 데이터 액세스: PRODUCT_INFO / TEMU_SALES / SHEIN_SALES 를
+# 서버 프로세스당 한 번만 로드·정규화하고, 각 페이지에는 읽기 전용 뷰만 전달
+import os
+import json
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+import streamlit as st
+from utils import (parse_temudate_series, parse_sheindate_series, clean_money, ensure_series,
+                   StyleKeyResolver, StyleSearchIndex)
+
+logger = logging.getLogger(__name__)
+
+GOOGLE_SHEET_URL = "https://docs.google.com/spreadsheets/d/1oyVzCgGK1Q3Qi_sbYwE-wKG6SArnfUDRe7rQfGOF-Eo"
+
+PRODUCT_SHEET = "PRODUCT_INFO"
+TEMU_SHEET    = "TEMU_SALES"
+SHEIN_SHEET   = "SHEIN_SALES"
+
+# 정규화된 프레임의 로컬 컬럼형 스냅샷 (Parquet)
+SNAPSHOT_DIR    = os.environ.get("SALES_SNAPSHOT_DIR", "/tmp/retail_dashboard_snapshot")
+SNAPSHOT_SCHEMA = 5                         # ingest 정규화가 바뀌면 올려서 기존 스냅샷 무효화
+TABLES = ("info", "temu", "shein")
+
+# 증분 동기화: 판매 시트는 아래로만 늘어나므로 새 행만 받아 붙인다
+SYNC_INTERVAL        = pd.Timedelta(minutes=10)   # 이 간격마다 새 행 확인
+FULL_RESYNC_INTERVAL = pd.Timedelta(hours=24)     # 중간 행 수정까지 반영하는 전체 재동기화 주기
+SALES_SHEETS = {"temu": TEMU_SHEET, "shein": SHEIN_SHEET}
+
+# =========================
+# Sheet fetch
+# =========================
+@st.cache_resource(show_spinner=False)
+def _spreadsheet():
+    """프로세스당 한 번만 인증하고 스프레드시트 핸들을 재사용 (토큰 갱신은 gspread 가 처리)"""
+    import gspread
+    from oauth2client.service_account import ServiceAccountCredentials
+    scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
+    creds_json = {k: str(v) for k, v in st.secrets["gcp_service_account"].items()}
+    creds = ServiceAccountCredentials.from_json_keyfile_dict(creds_json, scope)
+    return gspread.authorize(creds).open_by_url(GOOGLE_SHEET_URL)
+
+def _a1(sheet_name: str, rng: str = "") -> str:
+    title = "'" + sheet_name.replace("'", "''") + "'"
+    return f"{title}!{rng}" if rng else title
+
+def batch_read(ranges: list[str]) -> list[list]:
+    """여러 워크시트/범위를 values.batchGet 한 번의 API 호출로 읽음 (요청 순서대로 반환)"""
+    res = _spreadsheet().values_batch_get(ranges)
+    return [vr.get("values", []) for vr in res.get("valueRanges", [])]
+
+def _read_whole(sheet_name: str) -> list:
+    return _spreadsheet().values_get(_a1(sheet_name)).get("values", [])
+
+def fetch_values(sheet_names: list[str], batch: bool = False) -> dict:
+    """{시트명: get_all_values 형태}.
+
+    기본은 같은 클라이언트로 시트별 요청을 병렬 실행 → 지연은 가장 느린 시트 하나.
+    batch=True 면 batchGet 한 번으로 전부 받음 (요청 수 최소화).
+    """
+    if batch:
+        return dict(zip(sheet_names, batch_read([_a1(n) for n in sheet_names])))
+    with ThreadPoolExecutor(max_workers=len(sheet_names)) as ex:
+        return dict(zip(sheet_names, ex.map(_read_whole, sheet_names)))
+
+def _split_values(values: list) -> tuple[pd.DataFrame, dict]:
+    header, rows = (values[0], values[1:]) if values else ([], [])
+    return values_to_frame(header, rows), _sync_state(header, rows)
+
+def values_to_frame(header: list, rows: list) -> pd.DataFrame:
+    """get_all_values 형태(list of lists) → DataFrame. 뒤쪽 빈 셀이 잘린 행은 채워 넣음"""
+    width = len(header)
+    rows = [list(r[:width]) + [""] * (width - len(r)) for r in rows]
+    df = pd.DataFrame(rows, columns=header)
+    df.columns = [str(c).lower().strip() for c in df.columns]
+    return df
+
+def _sync_state(header: list, rows: list) -> dict:
+    """다음 증분 동기화를 위한 기록: 헤더, 데이터 행 수, 마지막 행 원본 값"""
+    return {"header": list(header), "rows": len(rows), "last_row": list(rows[-1]) if rows else []}
+
+def _trim(row: list) -> list:
+    # API 는 뒤쪽 빈 셀을 잘라서 주므로 비교 전에 같은 형태로 맞춤
+    row = list(row)
+    while row and row[-1] == "":
+        row.pop()
+    return row
+
+# =========================
+# Status code (판매/취소/환불 판정 — ingest 시 1회, 모든 페이지 공통)
+# =========================
+STATUS_OTHER, STATUS_SOLD, STATUS_CANCELED, STATUS_REFUNDED = 0, 1, 2, 3
+
+def _temu_status(label: str) -> int:
+    t = label.lower()
+    if "shipped" in t or "delivered" in t:
+        return STATUS_SOLD
+    if "cancel" in t:
+        return STATUS_CANCELED
+    return STATUS_OTHER
+
+def _shein_status(label: str) -> int:
+    # SHEIN 은 환불 외 전부 판매로 집계 (기존 규칙)
+    return STATUS_REFUNDED if "customer refunded" in label.lower() else STATUS_SOLD
+
+def status_codes(s: pd.Series, classify) -> pd.Series:
+    """상태 문자열 → int8 코드. 고유값만 판정"""
+    codes, uniq = pd.factorize(s.astype(str))
+    table = np.array([classify(u) for u in uniq] + [STATUS_OTHER], dtype=np.int8)
+    return pd.Series(table[codes], index=s.index)
+
+# =========================
+# Normalize (모든 페이지 공통)
+# =========================
+def _stringify_objects(df: pd.DataFrame) -> pd.DataFrame:
+    """object 컬럼은 문자열로 통일 (스냅샷/증분 행과 dtype 을 맞추기 위함)"""
+    for c in df.columns[df.dtypes == object]:
+        df[c] = df[c].astype(str)
+    return df
+
+def normalize_info(df: pd.DataFrame) -> pd.DataFrame:
+    return _stringify_objects(df.copy())
+
+def normalize_temu(df: pd.DataFrame) -> pd.DataFrame:
+    df = _stringify_objects(df.copy())
+    df["order date"], n_odd = parse_temudate_series(df["purchase date"])
+    if n_odd:
+        logger.warning("TEMU purchase date: %d rows did not match the dominant format (dateutil fallback)", n_odd)
+    df["order item status"]  = df["order item status"].astype(str)
+    df["status_code"]        = status_codes(df["order item status"], _temu_status)
+    df["quantity shipped"]   = pd.to_numeric(ensure_series(df, "quantity shipped", 0.0), errors="coerce").fillna(0)
+    df["quantity purchased"] = pd.to_numeric(ensure_series(df, "quantity purchased", 0.0), errors="coerce").fillna(0)
+    df["base price total"]   = clean_money(ensure_series(df, "base price total", 0.0)).fillna(0.0)
+    for c in ["color", "size"]:
+        if c not in df.columns:
+            df[c] = ""
+    return df
+
+def normalize_shein(df: pd.DataFrame) -> pd.DataFrame:
+    df = _stringify_objects(df.copy())
+    df["order date"] = parse_sheindate_series(df["order processed on"])
+    df["order status"]  = df["order status"].astype(str)
+    df["status_code"]   = status_codes(df["order status"], _shein_status)
+    df["product price"] = clean_money(ensure_series(df, "product price", 0.0)).fillna(0.0)
+    df["color"], df["size"] = split_seller_sku(ensure_series(df, "seller sku", ""))
+    return df
+
+def split_seller_sku(sku: pd.Series) -> tuple[pd.Series, pd.Series]:
+    """Seller SKU "STYLE-COLOR-SIZE" → (color, size).
+    사이즈는 마지막 토막, 색상은 스타일과 사이즈 사이 전부 ("-" 포함 색상명 대응).
+
+    >>> c, s = split_seller_sku(pd.Series(["BT5603-LIGHT-BLUE-XL", "BT5603-2XL", "BT5603-BLACK-S", "BT5603", ""]))
+    >>> c.tolist(), s.tolist()
+    (['LIGHT-BLUE', '', 'BLACK', '', ''], ['XL', '2XL', 'S', '', ''])
+    """
+    parts = sku.fillna("").astype(str).str.split("-")
+    n = parts.str.len()
+    color = parts.str[1:-1].str.join("-").str.strip().where(n >= 3, "")
+    size  = parts.str[-1].str.strip().where(n >= 2, "")
+    return color, size
+
+NORMALIZERS = {"info": normalize_info, "temu": normalize_temu, "shein": normalize_shein}
+
+# =========================
+# Style key (ingest 시 1회, 모든 페이지 공통)
+# =========================
+STYLE_LABEL = {"temu": "product number", "shein": "product description"}
+
+def catalog_keys(info: pd.DataFrame) -> tuple[str, ...]:
+    """PRODUCT_INFO 스타일 키 (대문자, 공백 제거). 빈 상품번호는 제외 — "" 는 모든 라벨에 포함 매칭되므로"""
+    keys = info.get("product number", pd.Series(dtype=str)).astype(str).str.upper().str.replace(" ", "", regex=False)
+    return tuple(keys[keys != ""])
+
+def style_key_series(df: pd.DataFrame, label_col: str, resolver: StyleKeyResolver) -> pd.Series:
+    """행별 스타일 키. 해석 순서: Seller SKU 앞부분 → 라벨(정확 일치 → 정규식 → 카탈로그 포함 매칭)"""
+    keys = pd.Series(None, index=df.index, dtype=object)
+    if "seller sku" in df.columns:
+        keys = resolver.resolve_series(df["seller sku"].astype(str).str.split("-", n=1).str[0])
+    miss = keys.isna() | keys.eq("")
+    if miss.any() and label_col in df.columns:
+        keys[miss] = resolver.resolve_series(df.loc[miss, label_col])
+    return keys
+
+def _attach_style_keys(snap: dict) -> None:
+    """판매 프레임에 style_key 컬럼 부여 (카탈로그가 바뀔 수 있으니 동기화마다 전체 재계산, 라벨 메모로 저렴)"""
+    resolver = style_resolver(catalog_keys(snap["info"]))
+    for name, label_col in STYLE_LABEL.items():
+        snap[name] = snap[name].assign(style_key=style_key_series(snap[name], label_col, resolver))
+
+# =========================
+# Date index (판매 프레임은 order date 오름차순, NaT 는 맨 뒤)
+# =========================
+DATE_COL = "order date"
+
+def sort_by_date(df: pd.DataFrame) -> pd.DataFrame:
+    """order date 기준 안정 정렬 (증분 동기화 후엔 거의 정렬돼 있어 저렴)"""
+    return df.sort_values(DATE_COL, kind="stable", na_position="last", ignore_index=True)
+
+def merge_by_date(df: pd.DataFrame, delta: pd.DataFrame) -> pd.DataFrame:
+    """정렬된 df 에 정렬된 delta 를 병합 (전체 재정렬 없이 삽입 위치만 이진 탐색, 복사 1회).
+    같은 날짜면 기존 행 뒤, NaT 는 맨 뒤 — sort_by_date 와 같은 순서 규칙"""
+    if delta.empty:
+        return df
+    pos = df[DATE_COL].to_numpy().searchsorted(delta[DATE_COL].to_numpy(), side="right")
+    # 삽입 위치별로 df 조각과 delta 조각을 번갈아 이어 붙임 (조각 수 ≤ 2 × 고유 위치 수 + 1)
+    cuts, starts = np.unique(pos, return_index=True)
+    ends = np.r_[starts[1:], len(delta)]
+    pieces, prev = [], 0
+    for cut, i, j in zip(cuts, starts, ends):
+        pieces += [df.iloc[prev:cut], delta.iloc[i:j]]
+        prev = cut
+    pieces.append(df.iloc[prev:])
+    return pd.concat(pieces, ignore_index=True)
+
+def slice_dates(df: pd.DataFrame, start, end) -> pd.DataFrame:
+    """start <= order date <= end 구간. 이진 탐색 + iloc 슬라이스라 O(log n), 복사 없음.
+
+    df 는 sort_by_date 순서를 유지해야 함 (load_sales_data 프레임과 그 얕은 복사본은 OK).
+    반환값은 원본 뷰이므로 컬럼을 추가하려면 .copy() 후에.
+    """
+    i, j = _date_bounds(df, start, end)
+    return df.iloc[i:j]
+
+def _date_bounds(df: pd.DataFrame, start, end) -> tuple[int, int]:
+    dates = df[DATE_COL].to_numpy()
+    i = dates.searchsorted(pd.Timestamp(start).to_datetime64(), side="left")
+    j = dates.searchsorted(pd.Timestamp(end).to_datetime64(), side="right")
+    return i, j
+
+# =========================
+# Variant (색상 × 사이즈 정규화, 양 플랫폼 공통)
+# =========================
+SIZE_MAP = {
+    "SMALL":"S","MEDIUM":"M","LARGE":"L",
+    "1XL":"1X","2XL":"2X","3XL":"3X",
+    "XS":"XS","S":"S","M":"M","L":"L","XL":"XL","XXL":"2X","XXXL":"3X"
+}
+
+def _map_unique(s: pd.Series, fn) -> pd.Series:
+    """고유값만 변환해서 factorize 코드로 되돌림"""
+    codes, uniq = pd.factorize(s.fillna("").astype(str))
+    return pd.Series(fn(pd.Series(uniq, dtype=object)).to_numpy()[codes], index=s.index, dtype=object)
+
+def canonical_color(s: pd.Series) -> pd.Series:
+    """공백 정리, "_" → " ", 대문자"""
+    return _map_unique(s, lambda u: u.str.strip().str.replace("_", " ", regex=False).str.upper())
+
+def canonical_size(s: pd.Series) -> pd.Series:
+    """대문자·공백 제거 후 SIZE_MAP (SMALL→S, 2XL/XXL→2X ...)"""
+    def _size(u):
+        t = u.str.strip().str.upper().str.replace(" ", "", regex=False)
+        return t.map(SIZE_MAP).fillna(t)
+    return _map_unique(s, _size)
+
+def pair_labels(color: pd.Series, size: pd.Series) -> np.ndarray:
+    """"색상 / 사이즈", 한쪽만 있으면 그 값, 둘 다 없으면 (미지정)"""
+    has_c, has_s = color.ne("").to_numpy(), size.ne("").to_numpy()
+    return np.select([has_c & has_s, has_c, has_s], [(color + " / " + size).to_numpy(), color.to_numpy(), size.to_numpy()], "(미지정)")
+
+# =========================
+# Order facts (양 플랫폼 주문 행을 같은 컬럼·같은 수량 의미로 합친 롱 포맷)
+# =========================
+# qty: 판매수량(TEMU shipped 합 / SHEIN 비환불 건수), sales: 판매분 매출
+# sold_cnt: 판매 주문 건수, qty_purchased: 전체 주문수량(SHEIN 은 건당 1)
+CUBE_MEASURES = ["qty", "qty_purchased", "sales", "sold_cnt", "refund_cnt", "cancel_cnt", "cancel_qty"]
+# product: 판매 시트 상품 라벨(TEMU product number / SHEIN product description), title: 고객 노출 상품명
+FACT_COLS = [DATE_COL, "platform", "style_key", "status_code", "product", "title", "color", "size"] + CUBE_MEASURES
+
+def _temu_facts(df: pd.DataFrame) -> pd.DataFrame:
+    sold = df["status_code"] == STATUS_SOLD
+    cancel = df["status_code"] == STATUS_CANCELED
+    return pd.DataFrame({
+        DATE_COL: df[DATE_COL],
+        "platform": "TEMU",
+        "style_key": df["style_key"],
+        "status_code": df["status_code"],
+        "product": ensure_series(df, "product number", ""),
+        "title": ensure_series(df, "product name by customer order", ""),
+        "color": canonical_color(df["color"]),
+        "size": canonical_size(df["size"]),
+        "qty": df["quantity shipped"].where(sold, 0.0),
+        "qty_purchased": df["quantity purchased"],
+        "sales": df["base price total"].where(sold, 0.0),
+        "sold_cnt": sold.astype(int),
+        "refund_cnt": 0,
+        "cancel_cnt": cancel.astype(int),
+        "cancel_qty": df["quantity purchased"].where(cancel, 0.0),
+    })
+
+def _shein_facts(df: pd.DataFrame) -> pd.DataFrame:
+    refund = df["status_code"] == STATUS_REFUNDED
+    label = ensure_series(df, "product description", "")
+    return pd.DataFrame({
+        DATE_COL: df[DATE_COL],
+        "platform": "SHEIN",
+        "style_key": df["style_key"],
+        "status_code": df["status_code"],
+        "product": label,
+        "title": label,
+        "color": canonical_color(df["color"]),
+        "size": canonical_size(df["size"]),
+        "qty": (~refund).astype(float),
+        "qty_purchased": 1.0,
+        "sales": df["product price"].where(~refund, 0.0),
+        "sold_cnt": (~refund).astype(int),
+        "refund_cnt": refund.astype(int),
+        "cancel_cnt": 0,
+        "cancel_qty": 0.0,
+    })
+
+def build_order_facts(temu: pd.DataFrame, shein: pd.DataFrame) -> pd.DataFrame:
+    """주문 행 팩트 테이블 (FACT_COLS). 날짜순이라 slice_dates 사용 가능, BOTH 는 platform 필터 생략"""
+    facts = pd.concat([_temu_facts(temu), _shein_facts(shein)], ignore_index=True)
+    return sort_by_date(facts)
+
+FACT_BUILDERS = {"temu": _temu_facts, "shein": _shein_facts}
+
+# =========================
+# Daily cube (일 × 플랫폼 × 스타일 × 색상 × 사이즈)
+# =========================
+CUBE_KEYS = [DATE_COL, "platform", "style_key", "color", "size"]
+
+def build_daily_cube(facts: pd.DataFrame) -> pd.DataFrame:
+    """주문 팩트 → 일 단위 롤업. 날짜 없는 행은 제외, style_key 없는 행은 NaN 키로 유지(합계용)"""
+    rows = facts[facts[DATE_COL].notna()].assign(**{DATE_COL: lambda d: d[DATE_COL].dt.normalize()})
+    cube = rows.groupby(CUBE_KEYS, dropna=False, sort=True)[CUBE_MEASURES].sum().reset_index()
+    return cube  # DATE_COL 이 첫 키라 날짜순 → slice_dates 사용 가능
+
+class RangeTotals:
+    """일 단위 누적합 배열. 임의의 [start, end] 합계가 배열 두 번 조회(O(1))."""
+
+    def __init__(self, daily: pd.DataFrame):
+        # daily: 빈 날 없이 연속된 일 인덱스 × 측정값
+        self.days = daily.index.to_numpy()
+        self.columns = daily.columns
+        values = daily.to_numpy(dtype=float)
+        self._cum = np.vstack([np.zeros((1, values.shape[1])), values.cumsum(axis=0)])
+
+    @property
+    def first_day(self) -> pd.Timestamp | None:
+        return pd.Timestamp(self.days[0]) if len(self.days) else None
+
+    @property
+    def last_day(self) -> pd.Timestamp | None:
+        return pd.Timestamp(self.days[-1]) if len(self.days) else None
+
+    def sum(self, start, end) -> pd.Series:
+        """start 가 속한 날 ~ end 가 속한 날 합계 (범위 밖은 잘림)"""
+        i = self.days.searchsorted(pd.Timestamp(start).normalize().to_datetime64(), side="left")
+        j = self.days.searchsorted(pd.Timestamp(end).to_datetime64(), side="right")
+        return pd.Series(self._cum[max(j, i)] - self._cum[i], index=self.columns)
+
+class VariantTable:
+    """스타일 × 플랫폼 × 변형(색상·사이즈) × 일 판매수량 (판매 주문이 있는 큐브 행).
+
+    dim: variant_id → color, size, pair (양 플랫폼 공통 id)
+    qty: (style_key, platform, variant_id, order date) 정렬 인덱스 → 스타일 하나의 전체 사이즈 커브가 인덱스 1회 조회
+    """
+
+    def __init__(self, cube: pd.DataFrame):
+        sold = cube[(cube["sold_cnt"] > 0) & cube["style_key"].notna()]
+        variants = sold.groupby(["color", "size"], sort=True)
+        codes = variants.ngroup().to_numpy()
+        dim = variants.size().index.to_frame(index=False)
+        dim["pair"] = pair_labels(dim["color"], dim["size"])
+        self.dim = dim.rename_axis("variant_id")
+        self.qty = pd.Series(
+            sold["qty"].to_numpy(),
+            index=pd.MultiIndex.from_arrays(
+                [sold["style_key"].to_numpy(), sold["platform"].to_numpy(), codes, sold[DATE_COL].to_numpy()],
+                names=["style_key", "platform", "variant_id", DATE_COL],
+            ),
+            name="qty",
+        ).sort_index()
+
+    def style(self, style_key: str, start=None, end=None, platform: str = "BOTH") -> pd.DataFrame:
+        """한 스타일의 [start, end] 변형별 일 판매 행 (platform, variant_id, order date, qty, color, size, pair)"""
+        cols = ["platform", "variant_id", DATE_COL, "qty", "color", "size", "pair"]
+        try:
+            rows = self.qty.loc[style_key].reset_index()
+        except KeyError:
+            return pd.DataFrame(columns=cols)
+        if platform != "BOTH":
+            rows = rows[rows["platform"] == platform]
+        if start is not None:
+            rows = rows[rows[DATE_COL] >= pd.Timestamp(start).normalize()]
+        if end is not None:
+            rows = rows[rows[DATE_COL] <= pd.Timestamp(end)]
+        return rows.join(self.dim, on="variant_id")[cols]
+
+def build_range_totals(cube: pd.DataFrame) -> dict[str, RangeTotals]:
+    """플랫폼별(TEMU/SHEIN/BOTH) 일 합계 → RangeTotals"""
+    days = pd.date_range(cube[DATE_COL].min(), cube[DATE_COL].max(), freq="D") if len(cube) else pd.DatetimeIndex([])
+    out = {}
+    for plat in ("TEMU", "SHEIN", "BOTH"):
+        part = cube if plat == "BOTH" else cube[cube["platform"] == plat]
+        daily = part.groupby(DATE_COL)[CUBE_MEASURES].sum().reindex(days, fill_value=0)
+        out[plat] = RangeTotals(daily)
+    return out
+
+# =========================
+# Multi-period comparison (현재/직전/WoW/MoM/YoY 를 한 번의 groupby 로)
+# =========================
+def comparison_windows(start, end) -> dict[str, tuple[pd.Timestamp, pd.Timestamp]]:
+    """cur 기준 비교 구간. prev: 직전 동일 길이, wow/mom/yoy: 1주/1개월/1년 전 같은 구간"""
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    days = (end - start).days + 1
+    out = {"cur": (start, end), "prev": (start - pd.Timedelta(days=days), start - pd.Timedelta(seconds=1))}
+    for label, off in (("wow", pd.Timedelta(days=7)), ("mom", pd.DateOffset(months=1)), ("yoy", pd.DateOffset(years=1))):
+        out[label] = (start - off, end - off)
+    return out
+
+def compare_periods(windows: dict, cube: pd.DataFrame) -> pd.DataFrame:
+    """windows {label: (start, end)} → (period, platform, style_key) × 측정값.
+
+    구간마다 이진 탐색으로 큐브 행 위치만 모은 뒤 period 라벨을 붙여 groupby 한 번.
+    구간이 겹쳐도 된다. style_key 없는 행은 NaN 키로 남아 합계에 포함된다.
+    """
+    idx, labels = [np.empty(0, dtype=int)], [np.empty(0, dtype=object)]
+    for label, (s, e) in windows.items():
+        i, j = _date_bounds(cube, s, e)
+        idx.append(np.arange(i, j))
+        labels.append(np.full(j - i, label, dtype=object))
+    rows = cube.iloc[np.concatenate(idx)].assign(period=np.concatenate(labels))
+    return rows.groupby(["period", "platform", "style_key"], dropna=False, sort=False)[CUBE_MEASURES].sum()
+
+def _period_rows(stats: pd.DataFrame, period: str, platform: str) -> pd.DataFrame:
+    if period not in stats.index.get_level_values("period"):
+        return pd.DataFrame(columns=CUBE_MEASURES, dtype=float)
+    d = stats.xs(period, level="period")
+    if platform != "BOTH":
+        if platform not in d.index.get_level_values("platform"):
+            return pd.DataFrame(columns=CUBE_MEASURES, dtype=float)
+        return d.xs(platform, level="platform")
+    return d.groupby(level="style_key", dropna=False).sum()
+
+def period_stats(stats: pd.DataFrame, period: str, platform: str = "BOTH") -> pd.DataFrame:
+    """compare_periods 결과에서 한 구간·플랫폼의 style_key × 측정값 (키 없는 행 제외)"""
+    d = _period_rows(stats, period, platform)
+    return d[d.index.notna()]
+
+def period_totals(stats: pd.DataFrame, period: str, platform: str = "BOTH") -> pd.Series:
+    """한 구간·플랫폼의 측정값 합계 (키 없는 행 포함)"""
+    return _period_rows(stats, period, platform).sum().reindex(CUBE_MEASURES, fill_value=0)
+
+# =========================
+# Latest price (스타일·플랫폼별 마지막 판매가/판매일)
+# =========================
+PRICE_COL = {"TEMU": "base price total", "SHEIN": "product price"}
+
+def build_latest_prices(temu: pd.DataFrame, shein: pd.DataFrame) -> pd.DataFrame:
+    """(platform, style_key) → price, last_date.
+
+    판매 프레임은 ingest 때 이미 날짜순 정렬(sort_by_date)이라 추가 정렬 없이 키별 마지막 행만 취한다.
+    .last() 는 컬럼별 마지막 non-null 이라 행이 섞일 수 있어 tail(1) 로 행 단위 유지.
+    """
+    parts = []
+    for plat, df in (("TEMU", temu), ("SHEIN", shein)):
+        rows = df[df[DATE_COL].notna() & df["style_key"].notna()]
+        parts.append(pd.DataFrame({
+            "platform": plat,
+            "style_key": rows["style_key"].to_numpy(),
+            "price": rows[PRICE_COL[plat]].to_numpy(dtype=float),
+            "last_date": rows[DATE_COL].to_numpy(),
+        }))
+    rows = pd.concat(parts, ignore_index=True)
+    return rows.groupby(["platform", "style_key"]).tail(1).set_index(["platform", "style_key"]).sort_index()
+
+def _derive(snap: dict) -> None:
+    """동기화/스냅샷 로드 후 공통 파생: 날짜 정렬 + style_key + 통합 주문 팩트 + 데이터 버전.
+    게시 전의 새 스냅샷 dict 에만 호출 (게시된 스냅샷은 수정하지 않음)"""
+    for name in SALES_SHEETS:
+        snap[name] = sort_by_date(snap[name])
+    _attach_style_keys(snap)
+    snap["facts"] = build_order_facts(snap["temu"], snap["shein"])
+    snap["info_hash"] = info_hash(snap["info"])
+    snap["version"] = _data_version(snap)
+
+def _derive_delta(cur: dict, new: dict, deltas: dict) -> None:
+    """증분 동기화용 _derive: 새 행(deltas)만 style_key/팩트를 만들고 기존 정렬 프레임에 병합.
+    카탈로그 키가 cur 와 같을 때만 사용 (기존 행의 style_key 가 그대로 유효)"""
+    resolver = style_resolver(catalog_keys(new["info"]))
+    fact_parts = []
+    for name, label_col in STYLE_LABEL.items():
+        delta = deltas.get(name)
+        if delta is None:
+            new[name] = cur[name]
+            continue
+        delta = sort_by_date(delta.assign(style_key=style_key_series(delta, label_col, resolver)))
+        new[name] = merge_by_date(cur[name], delta)
+        fact_parts.append(FACT_BUILDERS[name](delta))
+    new["facts"] = (merge_by_date(cur["facts"], sort_by_date(pd.concat(fact_parts, ignore_index=True)))
+                    if fact_parts else cur["facts"])
+    new["info_hash"] = info_hash(new["info"])
+    new["version"] = _data_version(new)
+
+# =========================
+# Snapshot (Parquet)
+# =========================
+def _snapshot_path(name: str) -> str:
+    return os.path.join(SNAPSHOT_DIR, f"{name}.parquet")
+
+def _meta_path() -> str:
+    return os.path.join(SNAPSHOT_DIR, "meta.json")
+
+def read_snapshot() -> tuple[dict, dict] | None:
+    """메타데이터(스키마/행 수)가 맞으면 (memory-map 으로 읽은 프레임, 메타), 아니면 None"""
+    try:
+        with open(_meta_path()) as f:
+            meta = json.load(f)
+        if meta.get("schema") != SNAPSHOT_SCHEMA:
+            return None
+        tables = {}
+        for name in TABLES:
+            df = pd.read_parquet(_snapshot_path(name), memory_map=True)
+            if len(df) != meta["rows"][name]:
+                return None
+            tables[name] = df
+        return tables, meta
+    except Exception:
+        return None
+
+def write_snapshot(tables: dict, sync: dict, full_synced_at: pd.Timestamp) -> None:
+    """임시 파일에 쓴 뒤 교체 → 다른 프로세스가 반쯤 쓰인 파일을 읽지 않음"""
+    try:
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        for name in TABLES:
+            tmp = _snapshot_path(name) + ".tmp"
+            tables[name].to_parquet(tmp, index=False)
+            os.replace(tmp, _snapshot_path(name))
+        meta = {
+            "schema": SNAPSHOT_SCHEMA,
+            "saved_at": pd.Timestamp.now().isoformat(),
+            "full_synced_at": full_synced_at.isoformat(),
+            "rows": {name: int(len(tables[name])) for name in TABLES},
+            "sync": sync,
+        }
+        with open(_meta_path() + ".tmp", "w") as f:
+            json.dump(meta, f)
+        os.replace(_meta_path() + ".tmp", _meta_path())
+    except Exception:
+        # 스냅샷은 캐시일 뿐 — 저장 실패해도 대시보드는 계속 동작 (다음 콜드 스타트는 전체 다운로드)
+        logger.exception("snapshot write failed")
+
+# =========================
+# Incremental sync
+# =========================
+def _tail_ranges(sheet_name: str, state: dict, grid_rows: int) -> list[str]:
+    """헤더, '마지막으로 받은 행', 그 아래 전체 범위.
+    그리드에 남은 행이 없으면 새 행도 없으므로 앞의 두 범위만."""
+    from gspread.utils import rowcol_to_a1
+    n = state["rows"]
+    ranges = [_a1(sheet_name, "1:1"), _a1(sheet_name, f"{n + 1}:{n + 1}")]
+    if n + 1 < grid_rows:
+        last_col = rowcol_to_a1(1, max(len(state["header"]), 1)).rstrip("0123456789")
+        ranges.append(_a1(sheet_name, f"A{n + 2}:{last_col}"))
+    return ranges
+
+def appended_rows(state: dict, header: list, last: list, tail: list) -> list | None:
+    """마지막 동기화 이후 추가된 행.
+
+    다시 읽은 헤더와 '마지막으로 받은 행'이 기록과 다르면(열 변경·행 삭제/정렬 등)
+    None → 전체 재동기화.
+    """
+    header = header[0] if header else []
+    last   = last[0] if last else []
+    if _trim(header) != _trim(state["header"]):
+        return None
+    if state["rows"] > 0 and _trim(last) != _trim(state["last_row"]):
+        return None
+    # 중간에 빈 행이 끼어 있는 경우도 get_all_values 와 같게 유지
+    return [list(r) for r in tail]
+
+def _new_rows(name: str, state: dict, new_rows: list) -> tuple[pd.DataFrame, dict]:
+    """새 행만 정규화한 (delta 프레임, 다음 동기화 상태)"""
+    delta = NORMALIZERS[name](values_to_frame(state["header"], new_rows))
+    new_state = {
+        "header": state["header"],
+        "rows": state["rows"] + len(new_rows),
+        "last_row": list(new_rows[-1]),
+    }
+    return delta, new_state
+
+SHEET_OF = {"info": PRODUCT_SHEET, **SALES_SHEETS}
+
+def _fetch_tables(names: list[str]) -> dict:
+    """{name: (정규화된 프레임, 동기화 상태)} — 시트 다운로드는 병렬"""
+    values = fetch_values([SHEET_OF[n] for n in names])
+    out = {}
+    for name in names:
+        raw, state = _split_values(values[SHEET_OF[name]])
+        out[name] = (NORMALIZERS[name](raw), state)
+    return out
+
+def info_hash(info: pd.DataFrame) -> str:
+    """PRODUCT_INFO 내용 해시 (컬럼명 포함)"""
+    digest = hashlib.sha1("|".join(info.columns).encode())
+    digest.update(pd.util.hash_pandas_object(info, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+def _data_version(snap: dict) -> str:
+    """데이터 버전 토큰: 전체 동기화 시각 + 행 수 + 내용 해시. 파생 캐시의 키로 사용.
+
+    판매 시트는 아래로만 늘어나므로 동기화 상태(헤더/행 수/마지막 행)로 충분하고,
+    행 중간이 수시로 편집되는 PRODUCT_INFO 는 내용 전체를 해시한다.
+    """
+    digest = hashlib.sha1(json.dumps(snap["sync"], sort_keys=True).encode())
+    digest.update(snap["info_hash"].encode())
+    rows = "-".join(str(len(snap[name])) for name in TABLES)
+    return f"{snap['full_synced_at'].isoformat()}:{rows}:{digest.hexdigest()[:16]}"
+
+# =========================
+# Process-level store
+# =========================
+# 데이터는 불변 스냅샷 dict 하나 {"info","temu","shein","facts","sync","full_synced_at","info_hash","version"} 로 묶어
+# store["current"] 에 한 번의 대입으로 교체. 게시된 스냅샷은 수정하지 않는다.
+_SNAPSHOT_WRITER = ThreadPoolExecutor(max_workers=1)   # 스냅샷 Parquet 기록 전용
+
+def _full_sync() -> dict:
+    fetched = _fetch_tables(list(TABLES))
+    out = {name: fetched[name][0] for name in TABLES}
+    out["sync"] = {name: fetched[name][1] for name in SALES_SHEETS}
+    out["full_synced_at"] = pd.Timestamp.now()
+    return out
+
+def _incremental_sync(cur: dict) -> dict | None:
+    """메타데이터 1회 + batchGet 1회로 두 판매 시트의 꼬리와 PRODUCT_INFO 전체를 받음.
+    cur(현재 스냅샷)는 읽기만 하고 파생까지 끝난 새 스냅샷을 반환, 바뀐 게 없으면 None.
+    평소(새 행만 추가, 카탈로그 키 그대로)에는 새 행만 처리해서 비용이 전체 이력이 아닌 추가분에 비례"""
+    grid = {ws.title: ws.row_count for ws in _spreadsheet().worksheets()}
+    ranges, spans = [], {}
+    for name, sheet in SALES_SHEETS.items():
+        rs = _tail_ranges(sheet, cur["sync"][name], grid.get(sheet, 0))
+        spans[name] = (len(ranges), len(rs))
+        ranges += rs
+    # PRODUCT_INFO 는 행 중간이 수시로 편집되고 크기가 작으므로 매번 전체 갱신
+    ranges.append(_a1(PRODUCT_SHEET))
+    results = batch_read(ranges)
+
+    out = {"sync": dict(cur["sync"]), "full_synced_at": cur["full_synced_at"],
+           "info": normalize_info(_split_values(results[-1])[0])}
+    deltas, resync = {}, []
+    for name, (i, k) in spans.items():
+        header, last, tail = (results[i:i + k] + [[]])[:3]
+        new_rows = appended_rows(cur["sync"][name], header, last, tail)
+        if new_rows is None:
+            # 헤더/기존 행이 바뀜 → 이 시트만 전체 재다운로드
+            resync.append(name)
+        elif new_rows:
+            deltas[name], out["sync"][name] = _new_rows(name, cur["sync"][name], new_rows)
+    if not resync and not deltas and info_hash(out["info"]) == cur["info_hash"]:
+        return None
+    if not resync and catalog_keys(out["info"]) == catalog_keys(cur["info"]):
+        _derive_delta(cur, out, deltas)
+        return out
+    # 재다운로드했거나 카탈로그 키가 바뀜 (기존 행의 style_key 도 바뀔 수 있음) → 전체 파생
+    if resync:
+        for name, (frame, state) in _fetch_tables(resync).items():
+            out[name], out["sync"][name] = frame, state
+    for name in SALES_SHEETS:
+        if name not in out:
+            out[name] = pd.concat([cur[name], deltas[name]], ignore_index=True) if name in deltas else cur[name]
+    _derive(out)
+    return out
+
+def _run_sync(store: dict, full: bool) -> None:
+    # 호출 측에서 store["lock"] 을 잡고 있어야 함.
+    # 새 스냅샷은 로컬 dict 에서 파생(버전 포함)까지 끝낸 뒤 한 번에 게시 → 실패 시 store 는 그대로.
+    # 증분 동기화에서 바뀐 게 없으면 스냅샷·버전 유지 (파생/스냅샷 기록 생략)
+    cur = store.get("current")
+    if full or cur is None:
+        new = _full_sync()
+        _derive(new)
+    else:
+        new = _incremental_sync(cur)
+    if new is not None:
+        store["current"] = new
+        # Parquet 재기록은 요청 경로 밖에서 (쓰기 스레드 1개라 순서대로 기록)
+        _SNAPSHOT_WRITER.submit(write_snapshot, {n: new[n] for n in TABLES}, new["sync"], new["full_synced_at"])
+    store["synced_at"] = pd.Timestamp.now()
+
+def sync_sales_data(full: bool = False) -> None:
+    """판매 시트 동기화. full=False 면 새 행만, True 면 전체 재다운로드.
+
+    스냅샷은 항상 새 객체로 교체하므로 이미 뷰를 받아 간 페이지에는 영향 없음.
+    """
+    store = _sales_store()
+    with store["lock"]:
+        _run_sync(store, full)
+
+@st.cache_resource(show_spinner=False)
+def _sales_store() -> dict:
+    """서버 프로세스 전체에서 공유되는 원본 스냅샷 (세션/페이지별 복사본 없음).
+    콜드 스타트는 로컬 스냅샷을 먼저 보고, 없을 때만 시트를 전부 받는다."""
+    store = {"lock": threading.Lock()}
+    loaded = read_snapshot()
+    if loaded is not None:
+        tables, meta = loaded
+        snap = {**tables, "sync": meta["sync"], "full_synced_at": pd.Timestamp(meta["full_synced_at"])}
+        _derive(snap)
+        store["current"] = snap
+        store["synced_at"] = pd.Timestamp(meta["saved_at"])
+    else:
+        _run_sync(store, full=True)
+    return store
+
+def _maybe_sync(store: dict) -> None:
+    now = pd.Timestamp.now()
+    if now - store["synced_at"] < SYNC_INTERVAL:
+        return
+    if not store["lock"].acquire(blocking=False):
+        # 다른 세션이 동기화 중 → 기다리지 않고 현재 데이터로 응답
+        return
+    try:
+        _run_sync(store, full=now - store["current"]["full_synced_at"] >= FULL_RESYNC_INTERVAL)
+    except Exception:
+        # 시트 API 오류 시 기존 데이터 유지 (갱신분은 게시 전에 버려짐), 다음 간격에 재시도
+        logger.exception("sales sync failed; keeping the previous data")
+        store["synced_at"] = now
+    finally:
+        store["lock"].release()
+
+# 스크립트 실행(스레드)별로 load_sales_data 가 고정한 스냅샷.
+# 같은 실행 안의 order_facts / daily_cube / data_version 등은 모두 이 스냅샷을 본다.
+_pinned = threading.local()
+
+def _current() -> dict:
+    snap = getattr(_pinned, "snap", None)
+    return snap if snap is not None else _sales_store()["current"]
+
+def load_sales_data() -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """(df_info, df_temu, df_shein) 읽기 전용 뷰. 판매 프레임에는 style_key 컬럼 포함,
+    order date 순으로 정렬돼 있어 기간 필터는 slice_dates 사용.
+
+    페이지 맨 앞에서 호출 — 이때 본 스냅샷을 이번 실행에 고정하므로, 이후의
+    order_facts / daily_cube / search_index 등은 도중에 동기화가 끝나도 같은 데이터 기준.
+    얕은 복사본이라 컬럼 추가/교체는 페이지 안에서만 보이지만,
+    기존 값의 in-place 수정(.loc 대입 등)은 공유 원본을 건드리므로 금지.
+    """
+    store = _sales_store()
+    _maybe_sync(store)
+    snap = _pinned.snap = store["current"]
+    return (
+        snap["info"].copy(deep=False),
+        snap["temu"].copy(deep=False),
+        snap["shein"].copy(deep=False),
+    )
+
+def order_facts() -> pd.DataFrame:
+    """양 플랫폼 통합 주문 행 (FACT_COLS) 읽기 전용 뷰. 날짜순, 플랫폼 필터는 platform 컬럼 하나로"""
+    return _current()["facts"].copy(deep=False)
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def style_resolver(catalog_keys: tuple[str, ...]) -> StyleKeyResolver:
+    """카탈로그 버전(키 목록)당 하나. 라벨별 메모도 프로세스 전체 세션이 공유"""
+    return StyleKeyResolver(catalog_keys)
+
+SEARCH_ATTR_COLS = ["sleeve", "neckline", "length", "fit", "detail", "style mood"]
+
+def build_search_index(info: pd.DataFrame) -> StyleSearchIndex:
+    """PRODUCT_INFO 행 순서 그대로 색인 (search 결과 = info 행 위치)"""
+    blank = pd.Series("", index=info.index)
+    attrs = [info[c].fillna("").astype(str) for c in SEARCH_ATTR_COLS if c in info.columns]
+    return StyleSearchIndex(
+        info.get("product number", blank).astype(str),
+        info.get("default product name(en)", blank).fillna("").astype(str),
+        pd.concat(attrs, axis=1).agg(" | ".join, axis=1) if attrs else blank,
+    )
+
+# 버전 키 캐시: 캐시 키는 version, 재료는 그 버전의 스냅샷 _snap (밑줄 인자는 해시 제외)
+@st.cache_resource(show_spinner=False, max_entries=2)
+def _search_index(version: str, _snap: dict) -> StyleSearchIndex:
+    return build_search_index(_snap["info"])
+
+def search_index() -> StyleSearchIndex:
+    """스타일 검색 인덱스. 카탈로그(데이터) 버전당 1회 생성, 질의는 n-gram 조회라 ms 단위.
+    load_sales_data 와 같은 스냅샷의 df_info 행 위치를 반환"""
+    snap = _current()
+    return _search_index(snap["version"], snap)
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def _daily_cube(version: str, _snap: dict) -> pd.DataFrame:
+    return build_daily_cube(_snap["facts"])
+
+def daily_cube() -> pd.DataFrame:
+    """일별 큐브 읽기 전용 뷰. 데이터 버전당 1회만 집계 (load_sales_data 이후 호출)"""
+    snap = _current()
+    return _daily_cube(snap["version"], snap).copy(deep=False)
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def _range_totals(version: str, _snap: dict) -> dict[str, RangeTotals]:
+    return build_range_totals(_daily_cube(version, _snap))
+
+def range_totals() -> dict[str, RangeTotals]:
+    """{"TEMU"|"SHEIN"|"BOTH": RangeTotals}. KPI/전기간 비교용, 데이터 버전당 1회 생성"""
+    snap = _current()
+    return _range_totals(snap["version"], snap)
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def _latest_prices(version: str, _snap: dict) -> dict[str, dict]:
+    table = build_latest_prices(_snap["temu"], _snap["shein"])
+    out = {plat: {} for plat in PRICE_COL}
+    for (plat, key), price, last in zip(table.index, table["price"], table["last_date"]):
+        out[plat][key] = (float(price), last)
+    return out
+
+def latest_prices() -> dict[str, dict]:
+    """{"TEMU"|"SHEIN": {style_key: (마지막 판매가, 마지막 판매일)}}. 데이터 버전당 1회 생성, 조회 O(1)"""
+    snap = _current()
+    return _latest_prices(snap["version"], snap)
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def _variant_table(version: str, _snap: dict) -> VariantTable:
+    return VariantTable(_daily_cube(version, _snap))
+
+def variant_table() -> VariantTable:
+    """색상·사이즈 변형 테이블. 데이터 버전당 1회 생성 (load_sales_data 이후 호출)"""
+    snap = _current()
+    return _variant_table(snap["version"], snap)
+
+def data_version() -> str:
+    """이번 실행이 보는 데이터 버전 (동기화로 판매 행이나 PRODUCT_INFO 내용이 바뀔 때마다 달라짐)"""
+    return _current()["version"]
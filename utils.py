@@ -1,26 +1,17 @@
+import re
+import heapq
+import numpy as np
 import pandas as pd
-import json
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
 from dateutil import parser
 
-GOOGLE_SHEET_URL = "https://docs.google.com/spreadsheets/d/1oyVzCgGK1Q3Qi_sbYwE-wKG6SArnfUDRe7rQfGOF-Eo"
-
-def load_google_sheet(sheet_name, st_secrets):
-    scope = [
-        "https://spreadsheets.google.com/feeds",
-        "https://www.googleapis.com/auth/drive"
-    ]
-    json_data = {k: str(v) for k, v in st_secrets["gcp_service_account"].items()}
-    with open("/tmp/service_account.json", "w") as f:
-        json.dump(json_data, f)
-    creds = ServiceAccountCredentials.from_json_keyfile_name("/tmp/service_account.json", scope)
-    client = gspread.authorize(creds)
-    sheet = client.open_by_url(GOOGLE_SHEET_URL).worksheet(sheet_name)
-    data = sheet.get_all_records()
-    df = pd.DataFrame(data)
-    df.columns = [c.lower().strip() for c in df.columns]
-    return df
+# TEMU purchase date 후보 포맷 ("(PDT)" 같은 접미사는 떼고 비교)
+TEMU_DATE_FORMATS = [
+    "%b %d, %Y, %I:%M %p", "%b %d, %Y %I:%M %p", "%b %d, %Y, %I:%M:%S %p", "%b %d, %Y",
+    "%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d",
+    "%m/%d/%Y %H:%M:%S", "%m/%d/%Y %H:%M", "%m/%d/%Y %I:%M:%S %p", "%m/%d/%Y %I:%M %p", "%m/%d/%Y",
+    "%Y/%m/%d %H:%M:%S", "%Y/%m/%d %H:%M", "%d %b %Y %H:%M:%S",
+]
+_EMPTY_DATES = ["", "nan", "none", "nat"]
 
 def parse_temudate(dt):
     try:
@@ -28,12 +19,206 @@ def parse_temudate(dt):
     except Exception:
         return pd.NaT
 
+def _dateutil_naive(x):
+    d = parse_temudate(x)
+    return d.replace(tzinfo=None) if pd.notna(d) and d.tzinfo else d
+
+def _dominant_format(values: pd.Series, formats: list[str], sample: int = 500) -> str | None:
+    """샘플에서 가장 많이 맞는 포맷 하나"""
+    head = values.iloc[:sample]
+    best, best_ok = None, 0
+    for fmt in formats:
+        ok = int(pd.to_datetime(head, format=fmt, errors="coerce").notna().sum())
+        if ok > best_ok:
+            best, best_ok = fmt, ok
+    return best
+
+def parse_temudate_series(s: pd.Series) -> tuple[pd.Series, int]:
+    """purchase date 컬럼 전체를 한 번에 파싱 → (datetime64 Series, dateutil 로 넘긴 행 수).
+
+    "(TZ)" 접미사 제거 → 고유값만 추려 주 포맷 하나로 to_datetime 일괄 변환 →
+    그 포맷에 안 맞는 소수 고유값만 기존 dateutil fuzzy 파서로 처리.
+    """
+    stripped = s.astype(str).str.split("(", n=1).str[0].str.strip()
+    codes, uniq = pd.factorize(stripped)
+    uniq = pd.Series(uniq, dtype=object)
+    blank = uniq.str.lower().isin(_EMPTY_DATES)
+    fmt = _dominant_format(uniq[~blank], TEMU_DATE_FORMATS)
+    if fmt:
+        parsed = pd.to_datetime(uniq, format=fmt, errors="coerce")
+    else:
+        parsed = pd.Series(pd.NaT, index=uniq.index, dtype="datetime64[ns]")
+    left = parsed.isna() & ~blank
+    if left.any():
+        parsed[left] = pd.to_datetime(uniq[left].map(_dateutil_naive), errors="coerce")
+    n_fallback = int(left.to_numpy()[codes].sum()) if len(codes) else 0
+    return pd.Series(parsed.to_numpy()[codes], index=s.index), n_fallback
+
 def parse_sheindate(dt):
     try:
-        return pd.to_datetime(str(dt), errors="coerce", infer_datetime_format=True)
+        return pd.to_datetime(str(dt), errors="coerce")
     except Exception:
         return pd.NaT
 
+def _sheindate_naive(x):
+    d = parse_sheindate(x)
+    return d.tz_localize(None) if pd.notna(d) and d.tzinfo else d
+
+def parse_sheindate_series(s: pd.Series) -> pd.Series:
+    """order processed on 컬럼 전체 파싱. 고유 타임스탬프만 한 번에 변환하고 factorize 코드로 되돌림
+    → 비용이 행 수가 아니라 고유값 수에 비례."""
+    codes, uniq = pd.factorize(s.astype(str).str.strip())
+    uniq = pd.Series(uniq, dtype=object)
+    try:
+        parsed = pd.to_datetime(uniq, errors="coerce")
+        if getattr(parsed.dt, "tz", None) is not None:
+            parsed = parsed.dt.tz_localize(None)
+    except Exception:
+        # 타임존이 섞인 경우 등 → 전부 개별 처리로
+        parsed = pd.Series(pd.NaT, index=uniq.index, dtype="datetime64[ns]")
+    # 첫 값 기준 포맷과 다른 소수 고유값만 개별 변환
+    left = parsed.isna() & ~uniq.str.lower().isin(_EMPTY_DATES)
+    if left.any():
+        parsed[left] = pd.to_datetime(uniq[left].map(_sheindate_naive), errors="coerce")
+    return pd.Series(parsed.to_numpy()[codes], index=s.index)
+
+STYLE_RE = re.compile(r"\b([A-Z]{1,3}\d{3,5}[A-Z0-9]?)\b")
+_END = object()  # 트라이 종단 표시
+
+class StyleKeyResolver:
+    """라벨(상품번호/상품설명) → 카탈로그 스타일 키.
+
+    매칭 순서는 기존 style_key_from_label 과 동일:
+    공백 제거 완전일치 → STYLE_RE 후보 → 라벨 안에 포함된 카탈로그 키(카탈로그 순서상 첫 번째).
+    마지막 단계는 키 전체 선형 탐색 대신 트라이로 라벨 위치마다 한 번씩만 훑고,
+    결과는 고유 라벨별로 메모이즈한다.
+    """
+
+    def __init__(self, catalog_keys):
+        self._order = {}
+        for k in catalog_keys:
+            self._order.setdefault(str(k), len(self._order))
+        self._keys = list(self._order)
+        self._trie = {}
+        for k, i in self._order.items():
+            node = self._trie
+            for ch in k:
+                node = node.setdefault(ch, {})
+            node[_END] = i
+        self._memo = {}
+
+    def _first_contained(self, s_key: str) -> str | None:
+        best = self._trie.get(_END)  # 빈 키("")는 기존 로직에서도 모든 라벨에 포함됨
+        for i in range(len(s_key)):
+            node = self._trie
+            for ch in s_key[i:]:
+                node = node.get(ch)
+                if node is None:
+                    break
+                j = node.get(_END)
+                if j is not None and (best is None or j < best):
+                    best = j
+        return self._keys[best] if best is not None else None
+
+    def _resolve(self, s: str) -> str | None:
+        s_key = s.replace(" ", "")
+        if s_key in self._order:
+            return s_key
+        m = STYLE_RE.search(s)
+        if m:
+            cand = m.group(1).replace(" ", "")
+            if cand in self._order:
+                return cand
+        return self._first_contained(s_key)
+
+    def resolve(self, label) -> str | None:
+        s = str(label).strip().upper()
+        if not s:
+            return None
+        if s not in self._memo:
+            self._memo[s] = self._resolve(s)
+        return self._memo[s]
+
+    def resolve_series(self, s: pd.Series) -> pd.Series:
+        """고유 라벨만 해석해서 factorize 코드로 되돌림"""
+        codes, uniq = pd.factorize(s.astype(str))
+        keys = np.array([self.resolve(u) for u in uniq] + [None], dtype=object)
+        return pd.Series(keys[codes], index=s.index, dtype=object)
+
+class StyleSearchIndex:
+    """카탈로그 검색 인덱스 (상품번호 / 영문 상품명 / 속성값) — 자동완성용.
+
+    필드별로 대문자 텍스트의 1~3글자 n-gram → 행 번호 역색인.
+    3글자 이하 질의는 해당 n-gram 목록이 곧 후보, 더 긴 질의는 3-gram 목록 교집합 후 부분문자열로 검증.
+    순위: 상품번호 일치 > 상품번호 접두 > 상품번호 포함 > 상품명 단어 접두 > 상품명 포함 > 속성값 포함,
+    같은 순위는 짧은 상품번호 먼저. 앞 필드에서 limit 개가 차면 뒤 필드는 보지 않는다.
+    """
+
+    GRAM = 3
+
+    def __init__(self, numbers, names, attrs):
+        self.numbers = [str(x).strip() for x in numbers]
+        self._fields = [
+            [n.upper().replace(" ", "") for n in self.numbers],
+            [str(x).strip().upper() for x in names],
+            [str(x).strip().upper() for x in attrs],
+        ]
+        self._grams = [self._build(texts) for texts in self._fields]
+
+    @classmethod
+    def _build(cls, texts: list[str]) -> dict:
+        grams = {}
+        for i, t in enumerate(texts):
+            for n in range(1, cls.GRAM + 1):
+                for j in range(len(t) - n + 1):
+                    grams.setdefault(t[j:j + n], set()).add(i)
+        return grams
+
+    def _candidates(self, field: int, q: str) -> set:
+        grams = self._grams[field]
+        if len(q) <= self.GRAM:
+            return grams.get(q, set())
+        posts = sorted((grams.get(q[j:j + self.GRAM], set()) for j in range(len(q) - self.GRAM + 1)), key=len)
+        return set.intersection(*posts) if posts[0] else set()
+
+    def _rank(self, field: int, i: int, q: str) -> int | None:
+        t = self._fields[field][i]
+        if field == 0:
+            return 0 if t == q else 1 if t.startswith(q) else 2 if q in t else None
+        if field == 1:
+            return 3 if t.startswith(q) or f" {q}" in t else 4 if q in t else None
+        return 5 if q in t else None  # None: n-gram 교집합 오탐
+
+    def search(self, query, limit: int = 30) -> list[int]:
+        """질의 → 순위순 행 번호 (최대 limit 개)"""
+        q = str(query).strip().upper()
+        out, seen = [], set()
+        if not q:
+            return out
+        for field, fq in ((0, q.replace(" ", "")), (1, q), (2, q)):
+            scored = []
+            for i in self._candidates(field, fq) - seen:
+                r = self._rank(field, i, fq)
+                if r is not None:
+                    scored.append((r, len(self.numbers[i]), self.numbers[i], i))
+            top = [i for *_, i in heapq.nsmallest(limit - len(out), scored)]
+            out += top
+            seen.update(top)
+            if len(out) >= limit:
+                break
+        return out
+
+def clean_money(x) -> pd.Series:
+    s = x if isinstance(x, pd.Series) else pd.Series(x)
+    s = s.astype(str).str.replace(r"[^0-9.\-]", "", regex=True).replace("", pd.NA)
+    s = pd.to_numeric(s, errors="coerce")
+    return s
+
+def ensure_series(df: pd.DataFrame, col: str, default: float = 0.0) -> pd.Series:
+    if col in df.columns:
+        return df[col]
+    return pd.Series([default] * len(df), index=df.index, dtype=float)
+
 def show_price_block(st, label, value):
     if value not in ("", None, float("nan")) and str(value).strip() not in ("", "nan", "NaN"):
         try:
@@ -45,39 +230,3 @@ def show_price_block(st, label, value):
             st.markdown(f"**{label}:** {price}")
         except:
             st.markdown(f"**{label}:** {value}")
-
-def get_latest_shein_price(df_sales, product_number):
-    filtered = df_sales[
-        df_sales["product description"].astype(str).str.strip().str.upper() == str(product_number).strip().upper()
-    ]
-    if not filtered.empty:
-        filtered = filtered.copy()
-        filtered["order date"] = pd.to_datetime(filtered["order processed on"], errors="coerce")
-        filtered = filtered.dropna(subset=["order date"])
-        if not filtered.empty:
-            latest = filtered.sort_values("order date").iloc[-1]
-            price = latest["product price"]
-            try:
-                price = float(str(price).replace("$", "").replace(",", ""))
-                return f"${price:.2f}"
-            except:
-                return "NA"
-    return "NA"
-
-def get_latest_temu_price(df_temu, product_number):
-    filtered = df_temu[
-        df_temu["product number"].astype(str).str.strip().str.upper() == str(product_number).strip().upper()
-    ]
-    if not filtered.empty:
-        filtered = filtered.copy()
-        filtered["order date"] = filtered["purchase date"].apply(parse_temudate)
-        filtered = filtered.dropna(subset=["order date"])
-        if not filtered.empty:
-            latest = filtered.sort_values("order date").iloc[-1]
-            price = latest["base price total"]
-            try:
-                price = float(str(price).replace("$", "").replace(",", ""))
-                return f"${price:.2f}"
-            except:
-                return "NA"
-    return "NA"